@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""Screenshot palette audit - which real pixels are off the consolidated palette.
+
+    python3 audit.py [--workers N] [--min-de 1.0] [--lut] PATH ...
+
+PATH is a PNG / PPM file or a directory of them. Files are read row by row (PNG
+IDAT is inflated incrementally, nothing is decoded up front; with NumPy, blocks of
+scanlines are unfiltered together) and histogrammed into
+unique colors in a process pool. As each histogram arrives, the colors not seen
+in earlier files are matched in one batch against the SCALE_FAMILIES / OTHER_TOKENS
+refs, so every distinct color of the run is matched once. Transparent pixels
+are composited on white like blend_on_white.
+
+Result: audit.html (off-palette colors by pixel coverage) and audit.json.
+"""
+
+import argparse, os, struct, zlib, json as _json
+from collections import Counter
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import generate as g
+
+OUT_DIR = "/tmp/color_analysis"
+MIN_DE = 1.0          # ΔE from the nearest ref at which a color counts as off-palette
+EXTENSIONS = (".png", ".ppm")
+BLOCK_ROWS = 64       # rows histogrammed together on the NumPy path
+PNG_BLOCK_ROWS = 512  # PNG scanlines unfiltered together on the NumPy path
+
+_np = False          # numpy, or None without it; imported by _numpy() on the first vectorized call
+
+def _numpy():
+    global _np
+    if _np is False:
+        try:
+            import numpy as _np
+        except ImportError:
+            _np = None
+    return _np
+
+# ============================================================
+# STREAMING READERS: yield (width, height) then rows of RGB bytes
+# ============================================================
+
+PNG_SIG = b"\x89PNG\r\n\x1a\n"
+
+def _png_chunks(f, path):
+    """Yield (type, data) up to IEND; a file that ends before it raises ValueError."""
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            raise ValueError(f"{path}: truncated PNG (no IEND)")
+        length, ctype = struct.unpack(">I4s", head)
+        data = f.read(length)
+        if len(data) < length or len(f.read(4)) < 4:   # data, CRC
+            raise ValueError(f"{path}: truncated {ctype.decode('latin-1')} chunk")
+        yield ctype, data
+        if ctype == b"IEND":
+            return
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    return a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+
+def _unfilter(ft, line, prev, bpp):
+    """Undo one PNG scanline filter in place (line, prev: bytearray)."""
+    n = len(line)
+    if ft == 0:
+        return
+    if _numpy() is not None and ft in (1, 2):
+        cur = _np.frombuffer(line, dtype=_np.uint8)
+        if ft == 2:
+            out = cur + _np.frombuffer(prev, dtype=_np.uint8)
+        else:   # Sub = running sum per channel, mod 256
+            out = _np.cumsum(cur.reshape(-1, bpp), axis=0, dtype=_np.uint64).astype(_np.uint8).ravel()
+        line[:] = out.tobytes()
+        return
+    if ft == 1:
+        for i in range(bpp, n): line[i] = (line[i] + line[i - bpp]) & 255
+    elif ft == 2:
+        for i in range(n): line[i] = (line[i] + prev[i]) & 255
+    elif ft == 3:
+        for i in range(n): line[i] = (line[i] + (((line[i - bpp] if i >= bpp else 0) + prev[i]) >> 1)) & 255
+    elif ft == 4:
+        for i in range(n):
+            a = line[i - bpp] if i >= bpp else 0
+            c = prev[i - bpp] if i >= bpp else 0
+            line[i] = (line[i] + _paeth(a, prev[i], c)) & 255
+    else:
+        raise ValueError(f"bad PNG filter type {ft}")
+
+def _unfilter_rows(block, prev, bpp):
+    """Undo the filters of consecutive scanlines [(filter type, line)] at once (NumPy) -> lines.
+    Every filter predicts a byte from its left (a), upper (b) and upper-left (c) neighbours, so the
+    pixels of one anti-diagonal are independent: Average and Paeth rows are solved a diagonal at a
+    time instead of byte by byte. Rows are stored skewed and transposed (pixel q of row i at
+    y[i + q, i]), which makes every diagonal a contiguous slice and its neighbours slices of the two
+    diagonals before it."""
+    np = _np
+    fts = np.array([ft for ft, _ in block], dtype=np.int16)
+    if fts.max() > 4:
+        raise ValueError(f"bad PNG filter type {fts.max()}")
+    k, w = len(block), len(prev) // bpp
+    raw = np.frombuffer(b"".join(line for _, line in block), dtype=np.uint8).reshape(k, w, bpp)
+    y = np.zeros((k + w + 1, k + 1, bpp), dtype=np.int16)     # row 0: the line above; y[i, i]: zero padding
+    rs = np.zeros_like(y)
+    y[1:w + 1, 0] = np.frombuffer(bytes(prev), dtype=np.uint8).reshape(w, bpp)
+    for i in range(1, k + 1):
+        rs[i + 1:i + w + 1, i] = raw[i - 1]
+    single = fts.min() == fts.max()
+    f = fts[:, None]
+    for d in range(2, k + w + 1):
+        lo, hi = max(1, d - w), min(k, d - 1)
+        a, b, c = y[d - 1, lo:hi + 1], y[d - 1, lo - 1:hi], y[d - 2, lo - 1:hi]
+        ft = fts[lo - 1] if single else f[lo - 1:hi]
+        paeth = None
+        if single and ft == 4 or not single:
+            da, db = b - c, a - c
+            pa, pb, pc = np.abs(da), np.abs(db), np.abs(da + db)
+            paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+        if single:
+            pred = (0, a, b, (a + b) >> 1, paeth)[ft]
+        else:
+            pred = np.select([ft == 1, ft == 2, ft == 3, ft == 4], [a, b, (a + b) >> 1, paeth], 0)
+        y[d, lo:hi + 1] = (rs[d, lo:hi + 1] + pred) & 255
+    return [bytearray(y[i + 1:i + w + 1, i].astype(np.uint8).tobytes()) for i in range(1, k + 1)]
+
+def _unfilter_block(block, prev, bpp):
+    """Unfiltered lines of consecutive scanlines [(filter type, line)]; prev is the line above the first."""
+    if _numpy() is not None and len(block) > 1 and any(ft in (3, 4) for ft, _ in block):
+        return _unfilter_rows(block, prev, bpp)
+    for ft, line in block:
+        _unfilter(ft, line, prev, bpp)
+        prev = line
+    return [line for _, line in block]
+
+def _on_white(rgba, channels):
+    """Interleaved gray/RGB(+alpha) 8-bit bytes -> RGB bytes composited on white."""
+    if channels == 3:
+        return bytes(rgba)
+    if _numpy() is not None:
+        a = _np.frombuffer(bytes(rgba), dtype=_np.uint8).reshape(-1, channels).astype(float)
+        color = _np.repeat(a[:, :1], 3, axis=1) if channels in (1, 2) else a[:, :3]
+        if channels in (2, 4):
+            alpha = a[:, -1:] / 255.0
+            color = _np.floor(color * alpha + 255 * (1 - alpha) + 0.5)
+        return color.astype(_np.uint8).tobytes()
+    out = bytearray()
+    for i in range(0, len(rgba), channels):
+        px = rgba[i:i + channels]
+        rgb = (px[0],) * 3 if channels in (1, 2) else tuple(px[:3])
+        if channels in (2, 4):
+            al = px[-1] / 255.0
+            rgb = tuple(round(c * al + 255 * (1 - al)) for c in rgb)
+        out += bytes(rgb)
+    return bytes(out)
+
+def png_rows(path):
+    with open(path, "rb") as f:
+        if f.read(8) != PNG_SIG:
+            raise ValueError(f"{path}: not a PNG")
+        chunks = _png_chunks(f, path)
+        ctype, ihdr = next(chunks)
+        if ctype != b"IHDR" or len(ihdr) != 13:
+            raise ValueError(f"{path}: missing or short IHDR")
+        width, height, depth, color, _, _, interlace = struct.unpack(">IIBBBBB", ihdr)
+        if interlace:
+            raise ValueError(f"{path}: interlaced PNG is not supported")
+        channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color]
+        if depth != 8 and not (depth == 16 and color != 3):
+            raise ValueError(f"{path}: bit depth {depth} is not supported")
+        bpp = channels * depth // 8
+        stride = width * bpp
+        yield width, height
+        meta = {}
+        lines = _png_scanlines(path, chunks, stride, meta)
+        block_rows = PNG_BLOCK_ROWS if _numpy() is not None else 1
+        prev = bytearray(stride)
+        done = 0
+        while True:
+            block = list(islice(lines, min(block_rows, height - done)))
+            if not block:
+                break
+            for line in _unfilter_block(block, prev, bpp):
+                prev = line
+                px = line[::2] if depth == 16 else line   # high byte of 16-bit samples
+                if color == 3:
+                    palette, trns = meta["PLTE"], meta.get("tRNS")
+                    if trns:
+                        alpha = trns + b"\xff" * (256 - len(trns))
+                        yield _on_white(b"".join(palette[3*i:3*i+3] + alpha[i:i+1] for i in px), 4)
+                    else:
+                        yield b"".join(palette[3*i:3*i+3] for i in px)
+                else:
+                    yield _on_white(px, channels)
+            done += len(block)
+        if done < height:
+            raise ValueError(f"{path}: truncated image data ({done} of {height} rows)")
+
+def _png_scanlines(path, chunks, stride, meta):
+    """Yield (filter type, filtered line) from the IDAT stream; PLTE / tRNS are put in meta on the way."""
+    z = zlib.decompressobj()
+    buf = bytearray()
+    seen_idat = False
+    for ctype, data in chunks:
+        if ctype in (b"PLTE", b"tRNS"):
+            meta[ctype.decode()] = data
+        elif ctype == b"IDAT":
+            seen_idat = True
+            buf += z.decompress(data)
+            while len(buf) > stride:
+                yield buf[0], bytearray(buf[1:stride + 1])
+                del buf[:stride + 1]
+    if not seen_idat:
+        raise ValueError(f"{path}: no IDAT chunk")
+
+def ppm_rows(path):
+    with open(path, "rb") as f:
+        tokens = []
+        while len(tokens) < 4:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"{path}: truncated PPM header")
+            tokens += line.split(b"#")[0].split()
+        if tokens[0] != b"P6":
+            raise ValueError(f"{path}: only binary PPM (P6) is supported")
+        width, height, maxval = int(tokens[1]), int(tokens[2]), int(tokens[3])
+        sample = 1 if maxval < 256 else 2
+        yield width, height
+        for _ in range(height):
+            row = f.read(width * 3 * sample)
+            if len(row) < width * 3 * sample:
+                raise ValueError(f"{path}: truncated PPM data")
+            if sample == 2:
+                row = row[::2]
+            if maxval not in (255, 65535):
+                row = bytes(min(255, round(v * 255 / (maxval if sample == 1 else maxval >> 8))) for v in row)
+            yield row
+
+def read_rows(path):
+    return png_rows(path) if path.lower().endswith(".png") else ppm_rows(path)
+
+# ============================================================
+# HISTOGRAM (runs in the worker pool)
+# ============================================================
+
+def histogram(path):
+    """-> (path, pixels, {packed 0xRRGGBB: count})."""
+    rows = read_rows(path)
+    width, height = next(rows)
+    counts = Counter()
+    if _numpy() is not None:
+        block = []
+        for row in rows:
+            block.append(row)
+            if len(block) == BLOCK_ROWS:
+                _count_block(block, counts); block = []
+        if block:
+            _count_block(block, counts)
+    else:
+        for row in rows:
+            counts.update(row[i:i + 3] for i in range(0, len(row), 3))
+        counts = Counter({int.from_bytes(k, "big"): v for k, v in counts.items()})
+    return path, width * height, dict(counts)
+
+def _count_block(rows, counts):
+    a = _np.frombuffer(b"".join(rows), dtype=_np.uint8).reshape(-1, 3).astype(_np.uint32)
+    u, c = _np.unique((a[:, 0] << 16) | (a[:, 1] << 8) | a[:, 2], return_counts=True)
+    counts.update(dict(zip(u.tolist(), c.tolist())))
+
+# ============================================================
+# MATCH DISTINCT COLORS
+# ============================================================
+
+def match_colors(colors, lut=None):
+    """{packed: (kind, name, ref, ΔE)} for every distinct color, in one batch."""
+    colors = list(colors)
+    rgb = [((c >> 16) & 255, (c >> 8) & 255, c & 255) for c in colors]
+    if lut is not None:
+        idx, de = lut.lookup_many(rgb)
+        return {c: (*g.REF_INDEX[i][:3], float(d)) for c, i, d in zip(colors, idx.tolist(), de.tolist())}
+    if _numpy() is not None and colors:
+        coords = g.METRIC.to_coords_batch(rgb)
+        d = _np.stack([g.METRIC.batch(coords, r[3]) for r in g.REF_INDEX], axis=1)
+        best = d.argmin(axis=1)   # first of equal minima, like find_best
+        return {c: (*g.REF_INDEX[i][:3], float(d[j, i])) for j, (c, i) in enumerate(zip(colors, best.tolist()))}
+    out = {}
+    for c, px in zip(colors, rgb):
+        best, ref, d = g.find_best(g.rgb_to_hex(*px))
+        out[c] = (best[0], best[1], ref, d)
+    return out
+
+def collect_paths(paths):
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, files in os.walk(p):
+                for name in sorted(files):
+                    if name.lower().endswith(EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield p
+
+def audit(paths, workers=None, min_de=MIN_DE, lut=None):
+    """Histogram files in a worker pool; each file is matched and folded in as it arrives,
+    so memory holds the distinct colors of the whole run, not every file's histogram."""
+    totals = Counter()
+    in_files = Counter()
+    matched = {}
+    per_file = []
+    errors = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(histogram, p): p for p in collect_paths(paths)}
+        for fut in as_completed(futures):
+            try:
+                path, pixels, counts = fut.result()
+            except (OSError, ValueError, KeyError, zlib.error) as e:
+                errors[futures[fut]] = str(e)
+                continue
+            new = [c for c in counts if c not in matched]
+            if new:
+                matched.update(match_colors(new, lut))
+            totals.update(counts)
+            in_files.update(counts.keys())
+            off_px = sum(n for c, n in counts.items() if matched[c][3] >= min_de)
+            per_file.append({"path": path, "pixels": pixels, "colors": len(counts), "off_palette": off_px / pixels if pixels else 0})
+    total_px = sum(totals.values())
+    off = []
+    for c, n in totals.most_common():
+        kind, name, ref, d = matched[c]
+        if d >= min_de:
+            off.append({"hex": f"#{c:06X}", "pixels": n, "coverage": n / total_px, "group": f"{kind}:{name}",
+                        "ref": ref, "delta": round(d, 1), "files": in_files[c]})
+    per_file.sort(key=lambda r: (-r["off_palette"], r["path"]))
+    return {"summary": {"files": len(per_file), "pixels": total_px, "colors": len(totals), "min_de": min_de, "metric": g.METRIC.name,
+                        "off_palette_colors": len(off), "off_palette_coverage": sum(o["pixels"] for o in off) / total_px if total_px else 0},
+            "off_palette": off, "files": per_file, "errors": errors}
+
+# ============================================================
+# REPORT
+# ============================================================
+
+def render_audit_html(report, limit=500):
+    s = report["summary"]
+    html = f"""<!DOCTYPE html>
+<html lang="ru"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width,initial-scale=1">
+<title>Color Tokens — Screenshot Audit</title>
+<style>{g.CSS}</style></head><body>
+<div class="hdr"><h1>Screenshot Audit</h1>
+<p>{s["files"]} скриншотов &middot; {s["pixels"]:,} пикселей &middot; {s["colors"]:,} уникальных цветов</p></div>
+<div class="c">
+<div class="stats" style="margin-top:32px">
+<div class="st"><div class="st-n">{s["files"]}</div><div class="st-l">Файлов</div></div>
+<div class="st"><div class="st-n">{s["colors"]:,}</div><div class="st-l">Уникальных цветов</div></div>
+<div class="st"><div class="st-n" style="color:var(--o)">{s["off_palette_colors"]:,}</div><div class="st-l">Вне палитры (ΔE≥{s["min_de"]})</div></div>
+<div class="st"><div class="st-n" style="color:var(--rd)">{s["off_palette_coverage"]:.1%}</div><div class="st-l">Покрытие вне палитры</div></div>
+</div>
+"""
+    html += '<div class="section-title">Цвета вне палитры — по площади</div>\n'
+    html += '<div class="fam"><div class="sc"><div class="lg-list">'
+    far = g.METRIC.thresholds["far"]
+    for o in report["off_palette"][:limit]:
+        cls = " far" if o["delta"] >= far else ""
+        far_tag = '<span class="lg-far-tag">далёкий</span>' if o["delta"] >= far else ""
+        html += f'<div class="lg{cls}"><div class="lg-sw" style="background:{o["hex"]}"></div><div class="lg-body"><div class="lg-n">{o["hex"]} · {o["coverage"]:.2%} ({o["pixels"]:,} px, файлов: {o["files"]})</div>'
+        html += f'<div class="lg-d">→ {o["group"]} {o["ref"]} ΔE {o["delta"]}{far_tag}</div></div></div>'
+    if len(report["off_palette"]) > limit:
+        html += f'<div class="lg-d">… ещё {len(report["off_palette"]) - limit} цветов в audit.json</div>'
+    html += '</div></div></div>\n'
+    html += '<div class="section-title">Файлы</div>\n<div class="fam"><div class="sc"><div class="lg-list">'
+    for f in report["files"]:
+        html += f'<div class="lg"><div class="lg-body"><div class="lg-n">{f["path"]}</div><div class="lg-d">{f["colors"]:,} цветов · вне палитры {f["off_palette"]:.1%}</div></div></div>'
+    for p, e in report["errors"].items():
+        html += f'<div class="lg far"><div class="lg-body"><div class="lg-n">{p}</div><div class="lg-d">SKIP: {e}</div></div></div>'
+    html += '</div></div></div>\n</div></body></html>'
+    return html
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Audit screenshots against the consolidated palette.")
+    ap.add_argument("paths", nargs="+", help="PNG/PPM files or directories")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--min-de", type=float, default=MIN_DE, help=f"off-palette ΔE threshold (default {MIN_DE})")
+    ap.add_argument("--lut", action="store_true", help="match through lut.py's precomputed table")
+    ap.add_argument("--metric", choices=list(g.METRICS), default="de2000", help="ΔE metric (generate.METRICS)")
+    args = ap.parse_args(argv)
+    if args.metric != g.METRIC.name:
+        g.set_metric(args.metric)
+    lut = None
+    if args.lut:
+        from lut import open_lut
+        lut = open_lut(verbose=True)
+    report = audit(args.paths, args.workers, args.min_de, lut)
+    s = report["summary"]
+    print(f"Файлов: {s['files']}, цветов: {s['colors']}, вне палитры: {s['off_palette_colors']} ({s['off_palette_coverage']:.1%} пикселей)")
+    for p, e in report["errors"].items():
+        print(f"SKIP {p}: {e}")
+    for name, text in [("audit.json", _json.dumps(report, ensure_ascii=False, indent=2)), ("audit.html", render_audit_html(report))]:
+        p = f"{OUT_DIR}/{name}"
+        try:
+            with open(p, "w", encoding="utf-8") as f:
+                f.write(text)
+            print(f"Written: {p} ({len(text)} bytes)")
+        except Exception as e:
+            print(f"SKIP {p}: {e}")
+
+if __name__ == "__main__":
+    main()
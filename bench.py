@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Benchmarks.
+
+    python3 bench.py [server] [metrics] [calibrate]
+
+server:    latency of server.py endpoints from a local keep-alive client
+           (server and client share one event loop, so numbers include both sides).
+metrics:   every registered ΔE metric - scalar and batch pair throughput, find_best latency.
+calibrate: median of every metric where ΔE2000 = 5 / 10 / 15 (the source of their threshold tables).
+"""
+
+import asyncio, random, statistics, sys, time, json as _json
+
+import generate as g
+
+def _pct(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * p / 100))]
+
+def _report(label, samples, n_items=1):
+    ms = [x * 1000 for x in samples]
+    print(f"{label:<28} p50 {statistics.median(ms):7.3f} ms  p95 {_pct(ms, 95):7.3f} ms  p99 {_pct(ms, 99):7.3f} ms"
+          + (f"  ({n_items / statistics.median(samples):,.0f} items/s)" if n_items > 1 else ""))
+
+def _random_hexes(n, seed=0):
+    rnd = random.Random(seed)
+    return [g.rgb_to_hex(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(n)]
+
+async def _bench_server(rounds):
+    import server
+    srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def call(method, path, payload=None):
+        body = _json.dumps(payload).encode() if payload is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        status = await reader.readline()
+        length = 0
+        while True:
+            h = await reader.readline()
+            if h == b"\r\n":
+                break
+            if h.lower().startswith(b"content-length:"):
+                length = int(h.split(b":")[1])
+        data = await reader.readexactly(length)
+        assert b" 200 " in status, (status, data)
+        return data
+
+    async def timed(label, method, path_fn, payload_fn=None, n_items=1):
+        samples = []
+        for i in range(rounds if n_items == 1 else max(3, rounds // 20)):
+            path, payload = path_fn(i), payload_fn(i) if payload_fn else None
+            t = time.perf_counter()
+            await call(method, path, payload)
+            samples.append(time.perf_counter() - t)
+        _report(label, samples, n_items)
+
+    hexes = _random_hexes(rounds)
+    batch = _random_hexes(1000, seed=1)
+    await timed("GET /match", "GET", lambda i: "/match?hex=%23" + hexes[i][1:])
+    await timed("GET /source", "GET", lambda i: "/source?hex=%23" + hexes[i][1:])
+    await timed("GET /scale", "GET", lambda i: "/scale?base=%23" + hexes[i][1:])
+    await timed("POST /de x1000", "POST", lambda i: "/de", lambda i: {"pairs": list(zip(batch, batch[1:] + batch[:1]))}, n_items=1000)
+    await timed("POST /match x1000", "POST", lambda i: "/match", lambda i: {"hexes": batch}, n_items=1000)
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0)   # let the server side see EOF before the loop shuts down
+    srv.close()
+    await srv.wait_closed()
+
+def bench_server(rounds=200):
+    print("== server ==")
+    asyncio.run(_bench_server(rounds))
+
+def _timeit(fn, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); samples.append(time.perf_counter() - t)
+    return samples
+
+def bench_metrics(n_pairs=20000, n_batch=200000, n_match=500):
+    print("== metrics ==")
+    rnd = random.Random(2)
+    rgb1 = [(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(n_batch)]
+    rgb2 = [(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(n_batch)]
+    hexes = _random_hexes(n_match, seed=3)
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    active = g.METRIC.name
+    try:
+        for name, m in g.METRICS.items():
+            c1 = [m.to_coords(*c) for c in rgb1[:n_pairs]]
+            c2 = [m.to_coords(*c) for c in rgb2[:n_pairs]]
+            _report(f"{name} scalar x{n_pairs}", _timeit(lambda: [m.scalar(a, b) for a, b in zip(c1, c2)], 3), n_pairs)
+            if np is not None:
+                b1, b2 = m.to_coords_batch(np.array(rgb1)), m.to_coords_batch(np.array(rgb2))
+                _report(f"{name} batch x{n_batch}", _timeit(lambda: m.batch(b1, b2)), n_batch)
+            g.set_metric(name)
+            _report(f"{name} find_best x{n_match}", _timeit(lambda: [g.find_best(h, coords=g.METRIC.to_coords(*g.hex_to_rgb(h))) for h in hexes], 3), n_match)
+    finally:
+        g.set_metric(active)
+
+def calibrate_metrics(n=200000, sigma=25, levels=(5, 10, 15)):
+    """Median of each metric over pairs whose ΔE2000 is within ±0.25 of each level
+    (random sRGB colors and Gaussian neighbours)."""
+    import numpy as np
+    print("== calibrate ==")
+    rng = np.random.default_rng(1)
+    base = rng.integers(0, 256, (n, 3))
+    near = np.clip(base + rng.normal(0, sigma, (n, 3)).round(), 0, 255)
+    d00 = g.delta_e_2000_batch(g.rgb_to_lab_batch(base), g.rgb_to_lab_batch(near))
+    for name, m in g.METRICS.items():
+        d = m.batch(m.to_coords_batch(base), m.to_coords_batch(near))
+        medians = [float(np.median(d[np.abs(d00 - t) < 0.25])) for t in levels]
+        print(f"{name:<8} " + "  ".join(f"ΔE2000 {t}: {v:6.2f}" for t, v in zip(levels, medians))
+              + f"   table {[m.thresholds[k] for k in ('merged', 'far', 'unmatched')]}")
+
+BENCHES = {"server": bench_server, "metrics": bench_metrics, "calibrate": calibrate_metrics}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    for name in argv or list(BENCHES):
+        BENCHES[name]()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Platform token files for the consolidated palette.
+
+One pass over generate.py's family tokens (iter_family_tokens) and OTHER_TOKENS;
+every group (a family, or "other") is rendered to all formats at once:
+
+    css/<group>.css                       custom properties, alpha as #RRGGBBAA
+    css/tokens.css                        @import of every group
+    android/values/colors_<group>.xml     <color> as #AARRGGBB
+    ios/Palette.xcassets/<token>.colorset sRGB components
+    kotlin/<Group>Colors.kt               Compose Color(0xAARRGGBB) constants
+    swift/Color+<Group>.swift             SwiftUI Color constants
+
+A manifest keeps a hash per group, so a run only rewrites the groups whose
+tokens changed and removes the files of groups that are gone.
+
+    python3 emit_tokens.py [out_dir] [--force]
+"""
+
+import hashlib, os, re, sys, json as _json
+
+import generate as g
+
+OUT_DIR = "/tmp/color_analysis/tokens"
+MANIFEST = "manifest.json"
+VERSION = 1               # bump when a format changes so cached groups are rewritten
+KOTLIN_PACKAGE = "com.palette.tokens"
+XCASSETS = "ios/Palette.xcassets"
+
+# ============================================================
+# TOKENS
+# ============================================================
+
+def iter_groups(families=None, others=None):
+    """Yield (group, [(token, (r, g, b, a))]) - families first, then "other".
+    extra_tokens go with their family unless OTHER_TOKENS already has the name."""
+    families = g.SCALE_FAMILIES if families is None else families
+    others = g.OTHER_TOKENS if others is None else others
+    for fname, tokens in g.iter_family_tokens(families):
+        items = [(name, argb(t["$value"])) for name, t in tokens.items()]
+        items += [(name, argb(h)) for name, h in families[fname]["extra_tokens"].items() if name not in others]
+        yield fname, items
+    yield "other", [(name, argb(h)) for name, h in others.items()]
+
+def argb(h):
+    """#RRGGBB or #AARRGGBB (the family_jsons alpha form) -> (r, g, b, a) ints."""
+    h = h.lstrip('#')
+    a = int(h[:2], 16) if len(h) == 8 else 255
+    return int(h[-6:-4], 16), int(h[-4:-2], 16), int(h[-2:], 16), a
+
+def snake(name):
+    return re.sub(r'[^0-9A-Za-z]+', '_', name).strip('_').lower()
+
+def pascal(name):
+    return "".join(w[:1].upper() + w[1:] for w in snake(name).split('_'))
+
+def camel(name):
+    p = pascal(name)
+    return p[:1].lower() + p[1:]
+
+# ============================================================
+# FORMATS: group -> {relative path: text}
+# ============================================================
+
+def render_css(group, items):
+    lines = [f"/* {group} */", ":root {"]
+    for name, (r, g_, b, a) in items:
+        value = f"#{r:02X}{g_:02X}{b:02X}" + (f"{a:02X}" if a != 255 else "")
+        lines.append(f"  --color-{snake(name).replace('_', '-')}: {value};")
+    return {f"css/{group}.css": "\n".join(lines + ["}", ""])}
+
+def render_android(group, items):
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', "<resources>"]
+    lines += [f'    <color name="{snake(name)}">#{a:02X}{r:02X}{g_:02X}{b:02X}</color>' for name, (r, g_, b, a) in items]
+    return {f"android/values/colors_{group}.xml": "\n".join(lines + ["</resources>", ""])}
+
+def render_ios(group, items):
+    out = {}
+    for name, (r, g_, b, a) in items:
+        color = {"color-space": "srgb", "components": {
+            "red": f"0x{r:02X}", "green": f"0x{g_:02X}", "blue": f"0x{b:02X}", "alpha": f"{a / 255:.3f}"}}
+        doc = {"colors": [{"color": color, "idiom": "universal"}], "info": {"author": "xcode", "version": 1}}
+        out[f"{XCASSETS}/{snake(name)}.colorset/Contents.json"] = _json.dumps(doc, indent=2) + "\n"
+    return out
+
+def render_kotlin(group, items):
+    lines = [f"package {KOTLIN_PACKAGE}", "", "import androidx.compose.ui.graphics.Color", "",
+             f"object {pascal(group)}Colors {{"]
+    lines += [f"    val {pascal(name)} = Color(0x{a:02X}{r:02X}{g_:02X}{b:02X})" for name, (r, g_, b, a) in items]
+    return {f"kotlin/{pascal(group)}Colors.kt": "\n".join(lines + ["}", ""])}
+
+def render_swift(group, items):
+    lines = ["import SwiftUI", "", "public extension Color {"]
+    for name, (r, g_, b, a) in items:
+        lines.append(f"    static let {camel(name)} = Color(.sRGB, red: {r / 255:.4f}, green: {g_ / 255:.4f}, "
+                     f"blue: {b / 255:.4f}, opacity: {a / 255:.4f})")
+    return {f"swift/Color+{pascal(group)}.swift": "\n".join(lines + ["}", ""])}
+
+FORMATS = {"css": render_css, "android": render_android, "ios": render_ios, "kotlin": render_kotlin, "swift": render_swift}
+
+def group_hash(items):
+    return hashlib.sha256(_json.dumps([VERSION, items]).encode()).hexdigest()[:16]
+
+# ============================================================
+# EMIT
+# ============================================================
+
+def _write(out_dir, rel, text):
+    path = os.path.join(out_dir, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def _remove(out_dir, rel):
+    path = os.path.join(out_dir, rel)
+    if os.path.exists(path):
+        os.remove(path)
+    parent = os.path.dirname(path)
+    if parent.endswith(".colorset") and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+
+def emit(out_dir=OUT_DIR, families=None, others=None, force=False):
+    """Write all formats, rewriting only changed groups. -> (written groups, skipped groups, removed groups)."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            old = _json.load(f)
+    except (OSError, ValueError):
+        old = {}
+    groups, written, skipped = {}, [], []
+    for group, items in iter_groups(families, others):
+        h = group_hash(items)
+        prev = old.get(group)
+        if not force and prev and prev["hash"] == h and all(os.path.exists(os.path.join(out_dir, p)) for p in prev["files"]):
+            groups[group] = prev
+            skipped.append(group)
+            continue
+        files = {}
+        for render in FORMATS.values():
+            files.update(render(group, items))
+        for rel, text in files.items():
+            _write(out_dir, rel, text)
+        for rel in set(prev["files"] if prev else ()) - set(files):
+            _remove(out_dir, rel)
+        groups[group] = {"hash": h, "files": sorted(files)}
+        written.append(group)
+    removed = [grp for grp in old if grp not in groups]
+    for grp in removed:
+        for rel in old[grp]["files"]:
+            _remove(out_dir, rel)
+    if written or removed or not os.path.exists(os.path.join(out_dir, XCASSETS, "Contents.json")):
+        _write(out_dir, f"{XCASSETS}/Contents.json", _json.dumps({"info": {"author": "xcode", "version": 1}}, indent=2) + "\n")
+        _write(out_dir, "css/tokens.css", "".join(f'@import "{grp}.css";\n' for grp in groups))
+    _write(out_dir, MANIFEST, _json.dumps(groups, ensure_ascii=False, indent=1))
+    return written, skipped, removed
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    force = "--force" in argv
+    argv = [a for a in argv if a != "--force"]
+    out_dir = argv[0] if argv else OUT_DIR
+    written, skipped, removed = emit(out_dir, force=force)
+    print(f"{out_dir}: {len(written)} groups written, {len(skipped)} unchanged, {len(removed)} removed")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 """V5 - Core names, Other group, Unmatched block, ALL colors verified."""
 
-import math, json as _json
-from collections import defaultdict, OrderedDict
+import marshal, math, os, sys, zlib
+from functools import lru_cache
+from collections import defaultdict, namedtuple, OrderedDict
+from itertools import chain
 
 # ============================================================
 # COLOR MATH
@@ -52,7 +54,129 @@ def delta_e_2000(lab1, lab2):
     dTheta=30*math.exp(-((avg_Hp-275)/25)**2); avg_Cp7=avg_Cp**7; RC=2*math.sqrt(avg_Cp7/(avg_Cp7+25**7)); RT=-RC*math.sin(math.radians(2*dTheta))
     return math.sqrt((dLp/SL)**2+(dCp/SC)**2+(dHp/SH)**2+RT*(dCp/SC)*(dHp/SH))
 
-def de(h1, h2): return delta_e_2000(rgb_to_lab(*hex_to_rgb(h1)), rgb_to_lab(*hex_to_rgb(h2)))
+def de(h1, h2): return METRIC.scalar(METRIC.to_coords(*hex_to_rgb(h1)), METRIC.to_coords(*hex_to_rgb(h2)))
+
+# Vectorized versions (NumPy, imported on first use) - same formulas and constants as above
+def rgb_to_lab_batch(rgb):
+    """(N,3) 0..255 -> (N,3) Lab."""
+    import numpy as np
+    c = np.asarray(rgb, dtype=float) / 255.0
+    lin = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    M = np.array([[0.4124564, 0.3575761, 0.1804375], [0.2126729, 0.7151522, 0.0721750], [0.0193339, 0.1191920, 0.9503041]])
+    t = (lin @ M.T) / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(t > 0.008856, np.power(t, 1/3), 7.787*t + 16/116)
+    return np.stack([116*f[:, 1]-16, 500*(f[:, 0]-f[:, 1]), 200*(f[:, 1]-f[:, 2])], axis=1)
+
+def delta_e_2000_batch(lab1, lab2):
+    """Row-wise ΔE2000 of two (N,3) Lab arrays (either may broadcast from (3,))."""
+    import numpy as np
+    lab1 = np.asarray(lab1, dtype=float); lab2 = np.asarray(lab2, dtype=float)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+    avg_L = (L1+L2)/2; C1 = np.sqrt(a1**2+b1**2); C2 = np.sqrt(a2**2+b2**2); avg_C = (C1+C2)/2
+    avg_C7 = avg_C**7; G = 0.5*(1-np.sqrt(avg_C7/(avg_C7+25**7)))
+    a1p = a1*(1+G); a2p = a2*(1+G); C1p = np.sqrt(a1p**2+b1**2); C2p = np.sqrt(a2p**2+b2**2); avg_Cp = (C1p+C2p)/2
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360; h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+    avg_Hp = np.where(np.abs(h1p-h2p) <= 180, (h1p+h2p)/2, np.where(h1p+h2p < 360, (h1p+h2p+360)/2, (h1p+h2p-360)/2))
+    T = 1-0.17*np.cos(np.radians(avg_Hp-30))+0.24*np.cos(np.radians(2*avg_Hp))+0.32*np.cos(np.radians(3*avg_Hp+6))-0.20*np.cos(np.radians(4*avg_Hp-63))
+    d = h2p-h1p
+    dhp = np.where(np.abs(d) <= 180, d, np.where(d > 180, d-360, d+360))
+    dLp = L2-L1; dCp = C2p-C1p; dHp = 2*np.sqrt(C1p*C2p)*np.sin(np.radians(dhp/2))
+    SL = 1+0.015*(avg_L-50)**2/np.sqrt(20+(avg_L-50)**2); SC = 1+0.045*avg_Cp; SH = 1+0.015*avg_Cp*T
+    dTheta = 30*np.exp(-((avg_Hp-275)/25)**2); avg_Cp7 = avg_Cp**7; RC = 2*np.sqrt(avg_Cp7/(avg_Cp7+25**7)); RT = -RC*np.sin(np.radians(2*dTheta))
+    return np.sqrt((dLp/SL)**2+(dCp/SC)**2+(dHp/SH)**2+RT*(dCp/SC)*(dHp/SH))
+
+# ============================================================
+# ΔE METRICS: registry used by matching, step assignment and stats
+# ============================================================
+# A metric works in its own coordinates (Lab, ICtCp, OKLab): to_coords / to_coords_batch
+# map 0..255 RGB there, scalar / batch measure two points (batch row-wise, broadcasting).
+# thresholds: exact / merged (<) and far / unmatched (>=) bins of the report, on that metric's scale.
+
+Metric = namedtuple("Metric", "name label to_coords to_coords_batch scalar batch thresholds")
+METRICS = OrderedDict()
+
+def register_metric(name, label, to_coords, to_coords_batch, scalar, batch, thresholds):
+    METRICS[name] = Metric(name, label, to_coords, to_coords_batch, scalar, batch, thresholds)
+
+def delta_e_94(lab1, lab2):
+    """CIE94, graphic arts weights (kL=1, K1=0.045, K2=0.015); lab2 is the reference
+    (find_best / find_step pass the palette color second)."""
+    L1,a1,b1=lab1; L2,a2,b2=lab2
+    C1=math.sqrt(a1**2+b1**2); C2=math.sqrt(a2**2+b2**2)
+    dL=L1-L2; dC=C1-C2; dH2=max(0.0,(a1-a2)**2+(b1-b2)**2-dC**2)
+    return math.sqrt(dL**2+(dC/(1+0.045*C2))**2+dH2/(1+0.015*C2)**2)
+
+def delta_e_94_batch(lab1, lab2):
+    import numpy as np
+    lab1 = np.asarray(lab1, dtype=float); lab2 = np.asarray(lab2, dtype=float)
+    C1 = np.hypot(lab1[..., 1], lab1[..., 2]); C2 = np.hypot(lab2[..., 1], lab2[..., 2])
+    d = lab1 - lab2; dC = C1 - C2
+    dH2 = np.maximum(0.0, d[..., 1]**2 + d[..., 2]**2 - dC**2)
+    return np.sqrt(d[..., 0]**2 + (dC/(1+0.045*C2))**2 + dH2/(1+0.015*C2)**2)
+
+def euclid(p1, p2): return math.sqrt(sum((x-y)**2 for x, y in zip(p1, p2)))
+
+def euclid_batch(p1, p2):
+    import numpy as np
+    return np.linalg.norm(np.asarray(p1, dtype=float) - np.asarray(p2, dtype=float), axis=-1)
+
+# ICtCp (ITU-R BT.2100 PQ) of SDR sRGB with white at ITP_WHITE_NITS; ΔEITP per ITU-R BT.2124
+ITP_WHITE_NITS = 100.0
+_709_TO_LMS = [[0.412109375*0.6274+0.523925781*0.0691+0.063964844*0.0164, 0.412109375*0.3293+0.523925781*0.9195+0.063964844*0.0880, 0.412109375*0.0433+0.523925781*0.0114+0.063964844*0.8956],
+               [0.166748047*0.6274+0.720458984*0.0691+0.112792969*0.0164, 0.166748047*0.3293+0.720458984*0.9195+0.112792969*0.0880, 0.166748047*0.0433+0.720458984*0.0114+0.112792969*0.8956],
+               [0.024169922*0.6274+0.075439453*0.0691+0.900390625*0.0164, 0.024169922*0.3293+0.075439453*0.9195+0.900390625*0.0880, 0.024169922*0.0433+0.075439453*0.0114+0.900390625*0.8956]]
+_PQ = (2610/16384, 2523/4096*128, 3424/4096, 2413/4096*32, 2392/4096*32)
+
+def _pq(y):
+    m1, m2, c1, c2, c3 = _PQ
+    p = (y * ITP_WHITE_NITS / 10000.0) ** m1
+    return ((c1 + c2*p) / (1 + c3*p)) ** m2
+
+def rgb_to_itp(r, g, b):
+    """(I, T, P) with T = Ct/2, so ΔEITP is 720 x the Euclidean distance."""
+    lin = (srgb_to_linear(r), srgb_to_linear(g), srgb_to_linear(b))
+    L_, M_, S_ = (_pq(sum(m*c for m, c in zip(row, lin))) for row in _709_TO_LMS)
+    return 0.5*L_ + 0.5*M_, 0.5*(6610*L_ - 13613*M_ + 7003*S_)/4096, (17933*L_ - 17390*M_ - 543*S_)/4096
+
+def rgb_to_itp_batch(rgb):
+    import numpy as np
+    c = np.asarray(rgb, dtype=float) / 255.0
+    lin = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    m1, m2, c1, c2, c3 = _PQ
+    p = np.power(np.clip(lin @ np.array(_709_TO_LMS).T, 0, None) * ITP_WHITE_NITS / 10000.0, m1)
+    L_, M_, S_ = np.moveaxis(((c1 + c2*p) / (1 + c3*p)) ** m2, -1, 0)
+    return np.stack([0.5*L_ + 0.5*M_, 0.5*(6610*L_ - 13613*M_ + 7003*S_)/4096, (17933*L_ - 17390*M_ - 543*S_)/4096], axis=-1)
+
+def delta_e_itp(itp1, itp2): return 720 * euclid(itp1, itp2)
+
+def delta_e_itp_batch(itp1, itp2): return 720 * euclid_batch(itp1, itp2)
+
+# OKLab x 100, so its distances read on a scale close to ΔE76 / ΔE2000
+def rgb_to_oklab100(r, g, b):
+    from oklch_scale import linear_to_oklab
+    return tuple(100 * v for v in linear_to_oklab(srgb_to_linear(r), srgb_to_linear(g), srgb_to_linear(b)))
+
+def rgb_to_oklab100_batch(rgb):
+    import numpy as np
+    from oklch_scale import linear_to_oklab_batch
+    c = np.asarray(rgb, dtype=float) / 255.0
+    return 100 * linear_to_oklab_batch(np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4))
+
+# merged / far / unmatched of the other metrics: their median value where ΔE2000 = 5 / 10 / 15,
+# over random sRGB colors and Gaussian neighbours, rounded (python3 bench.py calibrate)
+register_metric("de2000", "ΔE2000", rgb_to_lab, rgb_to_lab_batch, delta_e_2000, delta_e_2000_batch,
+                {"exact": 0.1, "merged": 5, "far": 10, "unmatched": 15})
+register_metric("cie94", "ΔE94", rgb_to_lab, rgb_to_lab_batch, delta_e_94, delta_e_94_batch,
+                {"exact": 0.1, "merged": 5.5, "far": 11, "unmatched": 16})
+register_metric("de76", "ΔE76", rgb_to_lab, rgb_to_lab_batch, euclid, euclid_batch,
+                {"exact": 0.1, "merged": 11, "far": 19, "unmatched": 26})
+register_metric("itp", "ΔEITP", rgb_to_itp, rgb_to_itp_batch, delta_e_itp, delta_e_itp_batch,
+                {"exact": 0.1, "merged": 16, "far": 29, "unmatched": 37})
+register_metric("oklab", "ΔEOK", rgb_to_oklab100, rgb_to_oklab100_batch, euclid, euclid_batch,
+                {"exact": 0.1, "merged": 4.5, "far": 7.5, "unmatched": 9.5})
+
+METRIC = METRICS["de2000"]
 
 def blend_on_white(hex_color, alpha):
     """Simple sRGB alpha compositing on white: result = base*alpha + 255*(1-alpha).
@@ -328,7 +452,6 @@ LEGACY = [
 ]
 
 TOTAL_INPUT = len(LEGACY)
-print(f"Всего цветов во входных данных: {TOTAL_INPUT}")
 
 # ============================================================
 # FAMILIES (names from Core tokens)
@@ -531,108 +654,461 @@ OTHER_TOKENS = OrderedDict([
     ("lemonade", "#FFCC00"),
 ])
 
+# ============================================================
+# SCHEMA: validate + normalize palette data once, up front
+# ============================================================
+# After normalize_palette every family has every key below (defaults filled in)
+# and every hex is canonical "#RRGGBB", so downstream code indexes directly.
+# It runs at import, with the other derived data (see PRECOMPILED REFERENCES).
+
+class PaletteError(ValueError):
+    pass
+
+def norm_hex(value, where):
+    """'#ddd7ff' / 'DDd7FF' -> '#DDD7FF'; 8-digit (AARRGGBB) keeps its alpha prefix."""
+    h = value.lstrip('#') if isinstance(value, str) else ""
+    if len(h) not in (6, 8) or any(c not in "0123456789abcdefABCDEF" for c in h):
+        raise PaletteError(f"{where}: bad hex {value!r}")
+    return "#" + h.upper()
+
+def pack_hex(h):
+    """Canonical hex -> 24-bit int 0xRRGGBB (alpha prefix dropped)."""
+    return int(h[-6:], 16)
+
+def _hex_map(value, where, key_ok, key_desc):
+    if not isinstance(value, dict):
+        raise PaletteError(f"{where}: expected dict, got {type(value).__name__}")
+    out = {}
+    for k, v in value.items():
+        if not key_ok(k):
+            raise PaletteError(f"{where}: bad key {k!r} ({key_desc})")
+        out[k] = norm_hex(v, f"{where}[{k!r}]")
+    return out
+
+def _alpha_map(value, where):
+    if not isinstance(value, dict):
+        raise PaletteError(f"{where}: expected dict, got {type(value).__name__}")
+    for k, v in value.items():
+        if not (isinstance(k, int) and 0 < k <= 100):
+            raise PaletteError(f"{where}: bad step {k!r} (int 1..100)")
+        if not (isinstance(v, (int, float)) and 0 < v <= 1):
+            raise PaletteError(f"{where}[{k}]: alpha {v!r} outside (0, 1]")
+    return dict(value)
+
+def _also_alpha(value, where):
+    if not isinstance(value, list):
+        raise PaletteError(f"{where}: expected list of (label, hex, {{step: alpha}})")
+    out = []
+    for i, item in enumerate(value):
+        if not (isinstance(item, (list, tuple)) and len(item) == 3 and isinstance(item[0], str)):
+            raise PaletteError(f"{where}[{i}]: expected (label, hex, {{step: alpha}})")
+        out.append((item[0], norm_hex(item[1], f"{where}[{i}]"), _alpha_map(item[2], f"{where}[{i}]")))
+    return out
+
+def _refs(value, where):
+    if not isinstance(value, list) or not value:
+        raise PaletteError(f"{where}: expected non-empty list of hex")
+    out = [norm_hex(h, f"{where}[{i}]") for i, h in enumerate(value)]
+    dups = sorted({h for h in out if out.count(h) > 1})
+    if dups:
+        raise PaletteError(f"{where}: duplicate refs {', '.join(dups)}")
+    return out
+
+def _of(kind):
+    def check(value, where):
+        if not isinstance(value, kind):
+            raise PaletteError(f"{where}: expected {kind.__name__}, got {type(value).__name__}")
+        return value
+    return check
+
+def _opt(check):
+    return lambda value, where: None if value is None else check(value, where)
+
+def _capacity(value, where):
+    """int per step, or {step: int}."""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k not in STEPS or not isinstance(v, int) or v < 0:
+                raise PaletteError(f"{where}: bad capacity {k!r}: {v!r}")
+        return dict(value)
+    if not isinstance(value, int) or value < 1:
+        raise PaletteError(f"{where}: expected int >= 1 or {{step: int}}, got {value!r}")
+    return value
+
+def copy_default(value):
+    return type(value)() if isinstance(value, (dict, list)) else value
+
+_step_key = (lambda k: k in STEPS, f"one of {STEPS}")
+
+# key -> (check/normalize, default); default REQUIRED = key must be present
+REQUIRED = object()
+FAMILY_SCHEMA = OrderedDict([
+    ("desc", (_of(str), REQUIRED)),
+    ("base_100", (norm_hex, REQUIRED)),
+    ("refs", (_refs, REQUIRED)),
+    ("existing_solid", (lambda v, w: _hex_map(v, w, *_step_key), {})),
+    ("cross_name", (_opt(_of(str)), None)),
+    ("alpha_base", (_opt(norm_hex), None)),
+    ("alpha_label", (_of(str), "")),
+    ("alpha_existing", (_alpha_map, {})),
+    ("also_alpha", (_also_alpha, [])),
+    ("extra_tokens", (lambda v, w: _hex_map(v, w, lambda k: isinstance(k, str), "token name"), {})),
+    ("extra_tokens_reason", (_of(str), "")),
+    ("skip_solid_scale", (_of(bool), False)),
+    ("is_new", (_of(bool), False)),
+    ("optimal_steps", (_of(bool), False)),
+    ("step_capacity", (_opt(_capacity), None)),
+])
+
+def find_duplicate_keys(path):
+    """Duplicate keys in dict literals of a source file - Python keeps the last one silently."""
+    import ast
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    problems = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Dict):
+            seen = {}
+            for k in node.keys:
+                if isinstance(k, ast.Constant):
+                    if k.value in seen:
+                        problems.append(f"{path}:{k.lineno}: duplicate key {k.value!r} (first at line {seen[k.value]})")
+                    else:
+                        seen[k.value] = k.lineno
+    return problems
+
+def normalize_palette(families, others, legacy=None):
+    """Validate everything once; return (families, others, legacy) with canonical hex and
+    all family keys filled. Raises PaletteError listing every problem found."""
+    errors = []
+    out_f = OrderedDict()
+    for fname, fdata in families.items():
+        where = f"SCALE_FAMILIES[{fname!r}]"
+        if not isinstance(fdata, dict):
+            errors.append(f"{where}: expected dict"); continue
+        unknown = [k for k in fdata if k not in FAMILY_SCHEMA and k != "final_solid"]
+        if unknown:
+            errors.append(f"{where}: unknown keys {unknown}")
+        norm = {}
+        for key, (check, default) in FAMILY_SCHEMA.items():
+            if key not in fdata:
+                if default is REQUIRED: errors.append(f"{where}: missing {key!r}")
+                else: norm[key] = copy_default(default)
+                continue
+            try:
+                norm[key] = check(fdata[key], f"{where}[{key!r}]")
+            except PaletteError as e:
+                errors.append(str(e))
+        out_f[fname] = norm
+    out_o = OrderedDict()
+    for tname, thex in others.items():
+        try:
+            out_o[tname] = norm_hex(thex, f"OTHER_TOKENS[{tname!r}]")
+        except PaletteError as e:
+            errors.append(str(e))
+    # one token name, one color: Other tokens vs extra_tokens
+    token_hex = dict(out_o)
+    for fname, norm in out_f.items():
+        for k, h in norm.get("extra_tokens", {}).items():
+            if k in token_hex and token_hex[k] != h:
+                errors.append(f"SCALE_FAMILIES[{fname!r}]['extra_tokens'][{k!r}]: {h} conflicts with {token_hex[k]} defined elsewhere")
+            token_hex.setdefault(k, h)
+    out_l = None
+    if legacy is not None:
+        out_l = []
+        for i, (lname, lhex, lnote) in enumerate(legacy):
+            try:
+                out_l.append((lname, norm_hex(lhex, f"LEGACY[{i}] {lname!r}"), lnote))
+            except PaletteError as e:
+                errors.append(str(e))
+    if errors:
+        raise PaletteError(f"{len(errors)} palette error(s):\n  " + "\n  ".join(errors))
+    return out_f, out_o, out_l
+
 # Build solid scales for all scale families
-for fname, fdata in SCALE_FAMILIES.items():
-    if fdata.get("skip_solid_scale"):
-        continue
-    existing = fdata.get("existing_solid", {})
-    base = fdata["base_100"]
-    proposed = generate_scale(base)
-    final = {}
-    for s in STEPS:
-        if s in existing:
-            final[s] = {"hex": existing[s], "src": "base"}
-        else:
-            final[s] = {"hex": proposed[s], "src": "proposed"}
-    fdata["final_solid"] = final
+def build_final_solid(families, scale_fn=generate_scale):
+    """Attach final_solid to every family: existing step if any, else the generated one
+    ({} with skip_solid_scale).
+    scale_fn: base hex -> {step: hex} (generate_scale or oklch_scale.generate_scale_oklch)."""
+    for fname, fdata in families.items():
+        if fdata["skip_solid_scale"]:
+            fdata["final_solid"] = {}
+            continue
+        existing = fdata["existing_solid"]
+        base = fdata["base_100"]
+        proposed = scale_fn(base)
+        final = {}
+        for s in STEPS:
+            if s in existing:
+                final[s] = {"hex": existing[s], "src": "base"}
+            else:
+                final[s] = {"hex": proposed[s], "src": "proposed"}
+        fdata["final_solid"] = final
+    return families
 
 # ============================================================
 # SOURCE TAGGING: web (Cross + CSS vars) vs mobile (Core + user list)
 # ============================================================
-# Collect all web hex values: Cross colors existing_solid + web CSS variables
-WEB_HEXES = set()
-for _fn, _fd in SCALE_FAMILIES.items():
-    if "cross_name" in _fd:
-        for _s, _h in _fd.get("existing_solid", {}).items():
-            WEB_HEXES.add(_h.upper())
-# Web CSS variables (--ds-color-*)
-WEB_HEXES.update({
-    "#765FDE", "#634AD6", "#5137C7", "#EAE6FF",
-    "#DDd7FF",  # secondary-hover (solid part)
-    "#CEC6FF",  # secondary-active
-    "#2F2F45", "#FFFFFF",
-    "#87D34C", "#74C336", "#57A718", "#E7F6DB",
-    "#EA3117", "#D5260E", "#BB210C", "#FFEEEE",
-    "#F5F6F7", "#F1EFFC", "#D6CFF5", "#BBAFEF", "#9F8FE8",
-    "#FF6170", "#FF4B5C", "#FF3A4E",
+# Web CSS variables (--ds-color-*): (variable, hex); the list only names a few of them
+WEB_CSS_VARS = [
+    ("--ds-color-*", "#765FDE"), ("--ds-color-*", "#634AD6"), ("--ds-color-*", "#5137C7"), ("--ds-color-*", "#EAE6FF"),
+    ("--ds-color-secondary-hover", "#DDd7FF"),  # solid part
+    ("--ds-color-secondary-active", "#CEC6FF"),
+    ("--ds-color-*", "#2F2F45"), ("--ds-color-*", "#FFFFFF"),
+    ("--ds-color-*", "#87D34C"), ("--ds-color-*", "#74C336"), ("--ds-color-*", "#57A718"), ("--ds-color-*", "#E7F6DB"),
+    ("--ds-color-*", "#EA3117"), ("--ds-color-*", "#D5260E"), ("--ds-color-*", "#BB210C"), ("--ds-color-*", "#FFEEEE"),
+    ("--ds-color-*", "#F5F6F7"), ("--ds-color-*", "#F1EFFC"), ("--ds-color-*", "#D6CFF5"), ("--ds-color-*", "#BBAFEF"), ("--ds-color-*", "#9F8FE8"),
+    ("--ds-color-*", "#FF6170"), ("--ds-color-*", "#FF4B5C"), ("--ds-color-*", "#FF3A4E"),
     # These overlap with Cross file but listed for completeness:
-    "#E5F7F6", "#B3E8E5", "#80D9D3", "#4CC9C2", "#00B2A8",
-    "#FFEFF1", "#FFD0D4", "#FFB0B8", "#FF909B",
-    "#FFFAEB", "#FEF0C5", "#FDE59E", "#FCDB76", "#FBCC3C",
-    "#EBF7FF", "#C4E7FF", "#9DD7FF", "#75C7FF", "#3AAFFF",
-    "#E7FAED", "#B7EECA", "#87E3A7", "#58D883", "#10C84E",
-    "#FFF3E7", "#FFDBB8", "#FFC388", "#FFAC58", "#FF8811",
-})
-
-def get_source(hex_val):
-    """Return 'web', 'mobile', or 'both'."""
-    in_web = hex_val.upper() in WEB_HEXES
-    return "web" if in_web else "mobile"
+    ("--ds-color-*", "#E5F7F6"), ("--ds-color-*", "#B3E8E5"), ("--ds-color-*", "#80D9D3"), ("--ds-color-*", "#4CC9C2"), ("--ds-color-*", "#00B2A8"),
+    ("--ds-color-*", "#FFEFF1"), ("--ds-color-*", "#FFD0D4"), ("--ds-color-*", "#FFB0B8"), ("--ds-color-*", "#FF909B"),
+    ("--ds-color-*", "#FFFAEB"), ("--ds-color-*", "#FEF0C5"), ("--ds-color-*", "#FDE59E"), ("--ds-color-*", "#FCDB76"), ("--ds-color-*", "#FBCC3C"),
+    ("--ds-color-*", "#EBF7FF"), ("--ds-color-*", "#C4E7FF"), ("--ds-color-*", "#9DD7FF"), ("--ds-color-*", "#75C7FF"), ("--ds-color-*", "#3AAFFF"),
+    ("--ds-color-*", "#E7FAED"), ("--ds-color-*", "#B7EECA"), ("--ds-color-*", "#87E3A7"), ("--ds-color-*", "#58D883"), ("--ds-color-*", "#10C84E"),
+    ("--ds-color-*", "#FFF3E7"), ("--ds-color-*", "#FFDBB8"), ("--ds-color-*", "#FFC388"), ("--ds-color-*", "#FFAC58"), ("--ds-color-*", "#FF8811"),
+]
+WEB_KINDS = {"cross", "css"}
+
+def build_provenance(families=None, others=None, legacy=None, css_vars=None):
+    """packed 0xRRGGBB -> every place the color is defined:
+    cross (Cross existing_solid step), css (web variable), core (Core token), legacy (user list)."""
+    families = SCALE_FAMILIES if families is None else families
+    others = OTHER_TOKENS if others is None else others
+    legacy = LEGACY if legacy is None else legacy
+    css_vars = WEB_CSS_VARS if css_vars is None else css_vars
+    index = defaultdict(list)
+    for fname, fdata in families.items():
+        if fdata["cross_name"]:
+            for s, h in fdata["existing_solid"].items():
+                index[pack_hex(h)].append({"kind": "cross", "name": f'{fdata["cross_name"]} {s}', "family": fname, "step": s})
+        if fdata["alpha_base"] and fdata["alpha_label"]:
+            index[pack_hex(fdata["alpha_base"])].append({"kind": "core", "name": fdata["alpha_label"], "family": fname})
+        for tname, h in fdata["extra_tokens"].items():
+            index[pack_hex(h)].append({"kind": "core", "name": tname, "family": fname})
+    for var, h in css_vars:
+        index[pack_hex(h)].append({"kind": "css", "name": var})
+    for tname, h in others.items():
+        index[pack_hex(h)].append({"kind": "core", "name": tname})
+    for lname, h, _ in legacy:
+        index[pack_hex(h)].append({"kind": "legacy", "name": lname})
+    return index
+
+def get_sources(hex_val, max_de=0.0, index=None):
+    """Sources of a color; with max_de > 0 also of colors within that ΔE -> [(ΔE, packed, source)]."""
+    index = PROVENANCE if index is None else index
+    c = pack_hex(hex_val)
+    out = [(0.0, c, src) for src in index.get(c, ())]
+    if max_de > 0:
+        coords = hex_coords(f"#{c:06X}")
+        for other, srcs in index.items():
+            if other != c:
+                d = METRIC.scalar(coords, hex_coords(f"#{other:06X}"))
+                if d <= max_de:
+                    out.extend((d, other, src) for src in srcs)
+        out.sort(key=lambda x: x[0])
+    return out
+
+def get_source(hex_val, index=None):
+    """Return 'web', 'mobile', 'both', or None for a color no source defines."""
+    index = PROVENANCE if index is None else index
+    kinds = {src["kind"] for src in index.get(pack_hex(hex_val), ())}
+    in_web = bool(kinds & WEB_KINDS)
+    in_mobile = bool(kinds - WEB_KINDS)
+    return "both" if in_web and in_mobile else "web" if in_web else "mobile" if in_mobile else None
+
+# ============================================================
+# REFERENCE INDEX: every ref with its coordinates, in the order find_best scans them
+# ============================================================
+
+@lru_cache(maxsize=None)
+def hex_lab(h):
+    """Lab of a hex string. Cached: refs and duplicate legacy hexes repeat a lot."""
+    return rgb_to_lab(*hex_to_rgb(h))
+
+@lru_cache(maxsize=None)
+def hex_coords(h):
+    """hex_lab for the active METRIC (its own coordinates); cleared by set_metric."""
+    return METRIC.to_coords(*hex_to_rgb(h))
+
+def metric_de(h1, h2):
+    return METRIC.scalar(hex_coords(h1), hex_coords(h2))
+
+def build_ref_index(families=None, others=None):
+    """[(kind, name, ref_hex, coords)] — scale family refs first, then Other tokens."""
+    families = SCALE_FAMILIES if families is None else families
+    others = OTHER_TOKENS if others is None else others
+    index = []
+    for fname, fdata in families.items():
+        for ref in fdata["refs"]:
+            index.append(("scale", fname, ref, hex_coords(ref)))
+    for tname, thex in others.items():
+        index.append(("other", tname, thex, hex_coords(thex)))
+    return index
+
+def set_metric(name):
+    """Make METRICS[name] the metric of matching, steps and stats; REF_INDEX is rebuilt for it."""
+    global METRIC, REF_INDEX
+    METRIC = METRICS[name]
+    hex_coords.cache_clear()
+    REF_INDEX = build_ref_index()
 
 # ============================================================
 # MATCHING: assign every legacy color to a family or Other or Unmatched
 # ============================================================
 
-def find_best(hex_color):
+def find_best(hex_color, index=None, coords=None):
+    index = REF_INDEX if index is None else index
+    coords = hex_coords(hex_color) if coords is None else coords
+    dist = METRIC.scalar
     best_f = None; best_de = 999; best_ref = None
-    # Check scale families
-    for fname, fdata in SCALE_FAMILIES.items():
-        for ref in fdata.get("refs", []):
-            d = de(hex_color, ref)
-            if d < best_de: best_de = d; best_f = ("scale", fname); best_ref = ref
-    # Check Other tokens
-    for tname, thex in OTHER_TOKENS.items():
-        d = de(hex_color, thex)
-        if d < best_de: best_de = d; best_f = ("other", tname); best_ref = thex
+    for kind, name, ref, ref_coords in index:
+        d = dist(coords, ref_coords)
+        if d < best_de: best_de = d; best_f = (kind, name); best_ref = ref
     return best_f, best_ref, best_de
 
-fam_legacy = defaultdict(list)
-other_legacy = defaultdict(list)
-unmatched = []
+def find_step(hex_color, final, coords=None):
+    """Nearest step of a family's final_solid scale -> (step, ΔE)."""
+    coords = hex_coords(hex_color) if coords is None else coords
+    best_s = None; best_d = 999
+    for s in STEPS:
+        d = METRIC.scalar(coords, hex_coords(final[s]["hex"]))
+        if d < best_d: best_d = d; best_s = s
+    return best_s, best_d
 
-for lname, lhex, lnote in LEGACY:
+def make_entry(lname, lhex, lnote, best, ref, delta, families=None, with_step=True, coords=None):
+    """Entry dict for one legacy color given its find_best result."""
+    families = SCALE_FAMILIES if families is None else families
     is_dup = "дубл" in lnote.lower() or "алиас" in lnote.lower()
-    best, ref, delta = find_best(lhex)
     entry = {"name": lname, "hex": lhex, "note": lnote, "delta": round(delta,1), "is_dup": is_dup, "ref": ref, "source": get_source(lhex)}
-
-    if best[0] == "scale":
-        fname = best[1]
-        fdata = SCALE_FAMILIES[fname]
-        final = fdata.get("final_solid", {})
+    if best[0] == "scale" and with_step:
+        final = families[best[1]]["final_solid"]
         if final:
-            best_s = None; best_d = 999
-            for s in STEPS:
-                d = de(lhex, final[s]["hex"])
-                if d < best_d: best_d = d; best_s = s
+            best_s, best_d = find_step(lhex, final, coords)
             entry["assigned_step"] = best_s
             entry["step_de"] = round(best_d, 1)
-        fam_legacy[fname].append(entry)
-    else:
-        other_legacy[best[1]].append(entry)
+    return entry
+
+def match_legacy(legacy=None, families=None, others=None, only=None):
+    """Run matching for a palette version -> (fam_legacy, other_legacy).
+
+    only: family names whose step assignment is needed. Every color is still matched
+    to its group (stats stay global), but steps of the other families are skipped.
+    """
+    legacy = LEGACY if legacy is None else legacy
+    families = SCALE_FAMILIES if families is None else families
+    index = build_ref_index(families, others)
+    fam_legacy = defaultdict(list)
+    other_legacy = defaultdict(list)
+    for lname, lhex, lnote in legacy:
+        best, ref, delta = find_best(lhex, index)
+        entry = make_entry(lname, lhex, lnote, best, ref, delta, families, only is None or best[1] in only)
+        if best[0] == "scale":
+            fam_legacy[best[1]].append(entry)
+        else:
+            other_legacy[best[1]].append(entry)
+    # Families with "optimal_steps": min-ΔE assignment under step capacities instead of nearest step
+    for fname, fdata in families.items():
+        if only is not None and fname not in only:
+            continue
+        if fdata["optimal_steps"] and fdata["final_solid"] and fam_legacy.get(fname):
+            assign_family_steps(fname, fdata, fam_legacy[fname])
+    return fam_legacy, other_legacy
+
+def assign_family_steps(fname, fdata, entries):
+    """optimal_steps assignment of one family's entries (match_legacy and stream.match_stream).
+    Capacities that cannot hold every distinct color raise PaletteError naming the family."""
+    from optimal_assign import assign_optimal, step_capacities
+    n = len({e["hex"] for e in entries})
+    room = sum(step_capacities(n, STEPS, fdata["step_capacity"]))
+    if room < n:
+        raise PaletteError(f"SCALE_FAMILIES[{fname!r}]['step_capacity']: room for {room} colors, "
+                           f"{n} distinct legacy colors matched the family")
+    return assign_optimal(entries, fdata["final_solid"], STEPS, metric_de, fdata["step_capacity"])
 
-TOTAL_OUTPUT = sum(len(v) for v in fam_legacy.values()) + sum(len(v) for v in other_legacy.values())
-print(f"Распределено: {TOTAL_OUTPUT} (семейства: {sum(len(v) for v in fam_legacy.values())}, other: {sum(len(v) for v in other_legacy.values())})")
-assert TOTAL_OUTPUT == TOTAL_INPUT, f"ПОТЕРЯНЫ ЦВЕТА! {TOTAL_INPUT} != {TOTAL_OUTPUT}"
-print("✓ Все цвета на месте!")
+# ============================================================
+# WEB COMPARISON: app alpha scale vs web palette, by step
+# ============================================================
+
+WEB_MATCH_DE = 3.0          # without Cross, the nearest of the family's own web colors within this ΔE stands in
+CMP_MATCH_DE, CMP_CLOSE_DE = 1.0, 5.0
+
+def alpha_steps(fdata):
+    """[(step, alpha)] of a family's alpha scale: existing alphas plus the STEPS defaults."""
+    ae = fdata["alpha_existing"]
+    return [(s, ae[s] if s in ae else s/100.0) for s in sorted(set(list(ae.keys()) + STEPS), reverse=True)]
+
+def cmp_status(d):
+    if d is None: return "missing"
+    return "match" if d < CMP_MATCH_DE else "close" if d < CMP_CLOSE_DE else "mismatch"
+
+def _de2000_pairs(pairs):
+    """ΔE2000 of [(lab, lab)] in one delta_e_2000_batch call; scalar loop without NumPy."""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return [delta_e_2000(a, b) for a, b in pairs]
+    return delta_e_2000_batch([a for a, _ in pairs], [b for _, b in pairs]).tolist() if pairs else []
+
+def build_web_comparison(families=None, provenance=None, index=None):
+    """Per family, per alpha step: app color (alpha on white) vs the web value for that step.
+    A family with Cross steps is compared with the same Cross step; a step Cross does not have
+    is "unaligned". Any other family gets the nearest of its own web colors within WEB_MATCH_DE:
+    a web color belongs to its Cross family, else to the scale family of its nearest ref.
+    also_alpha scales have no web steps and are listed as not_compared.
+    Everything is ΔE2000, whatever METRIC is, and every pair is measured in one batch."""
+    families = SCALE_FAMILIES if families is None else families
+    provenance = PROVENANCE if provenance is None else provenance
+    index = REF_INDEX if index is None else index
+    web = [(f"#{c:06X}", [src for src in srcs if src["kind"] in WEB_KINDS]) for c, srcs in provenance.items()]
+    web = [(h, srcs) for h, srcs in web if srcs]
+    plan = [(fname, s, av, blend_on_white(fdata["alpha_base"], av))
+            for fname, fdata in families.items() if fdata["alpha_base"] for s, av in alpha_steps(fdata)]
+    apps = list(dict.fromkeys(p[3] for p in plan))
+    web_labs = [hex_lab(h) for h, _ in web]
+    ref_labs = [hex_lab(r[2]) for r in index]
+    d = _de2000_pairs([(hex_lab(a), wl) for a in apps for wl in web_labs] +
+                      [(wl, rl) for wl in web_labs for rl in ref_labs])
+    nw, nr = len(web), len(ref_labs)
+    app_row = {a: d[i * nw:(i + 1) * nw] for i, a in enumerate(apps)}
+    web_pos = {h: j for j, (h, _) in enumerate(web)}
+    own = defaultdict(list)     # family -> web positions it owns, provenance order
+    for j, (h, srcs) in enumerate(web):
+        owner = next((src["family"] for src in srcs if src["kind"] == "cross"), None)
+        if owner is None and nr:
+            row = d[len(apps) * nw + j * nr:len(apps) * nw + (j + 1) * nr]
+            kind, name = index[min(range(nr), key=row.__getitem__)][:2]
+            owner = name if kind == "scale" else None
+        own[owner].append(j)
+    out = OrderedDict()
+    for fname, s, av, app in plan:
+        fdata = families[fname]
+        fam = out.get(fname)
+        if fam is None:
+            fam = out[fname] = {"cross_name": fdata["cross_name"], "steps": [],
+                                "not_compared": [f"{albl} {ahex}" for albl, ahex, _ in fdata["also_alpha"]]}
+        cross = fdata["cross_name"] and fdata["existing_solid"]
+        row = {"step": s, "alpha": av, "app": app, "web": None, "web_source": None, "de": None}
+        dist = app_row[app]
+        if cross:
+            if s in fdata["existing_solid"]:
+                h = fdata["existing_solid"][s]
+                row.update(web=h, web_source=f'{fdata["cross_name"]} {s}', de=round(dist[web_pos[h]], 1))
+        elif own[fname]:
+            j = min(own[fname], key=dist.__getitem__)
+            if dist[j] <= WEB_MATCH_DE:
+                row.update(web=web[j][0], web_source=web[j][1][0]["name"], de=round(dist[j], 1))
+        row["status"] = "unaligned" if cross and row["web"] is None else cmp_status(row["de"])
+        fam["steps"].append(row)
+    for fam in out.values():
+        des = [r["de"] for r in fam["steps"] if r["de"] is not None]
+        fam["max_de"] = max(des) if des else None
+        fam["mean_de"] = round(sum(des) / len(des), 2) if des else None
+    return out
 
 # ============================================================
 # HTML GENERATION
 # ============================================================
 
-exact_c = sum(1 for items in fam_legacy.values() for i in items if i["delta"]<0.1) + sum(1 for items in other_legacy.values() for i in items if i["delta"]<0.1)
-merged_c = sum(1 for items in fam_legacy.values() for i in items if 0.1<=i["delta"]<5) + sum(1 for items in other_legacy.values() for i in items if 0.1<=i["delta"]<5)
-far_c = sum(1 for items in fam_legacy.values() for i in items if i["delta"]>=10) + sum(1 for items in other_legacy.values() for i in items if i["delta"]>=10)
-
 CSS = """
 :root{--bg:#F5F5F7;--card:#FFF;--text:#1D1D1F;--t2:#86868B;--t3:#AEAEB2;--brd:rgba(0,0,0,.06);--sh:0 1px 3px rgba(0,0,0,.04),0 4px 14px rgba(0,0,0,.06);--sh2:0 2px 8px rgba(0,0,0,.04),0 12px 40px rgba(0,0,0,.08);--r:16px;--g:#34C759;--bl:#007AFF;--o:#FF9500;--rd:#FF3B30}
 *{box-sizing:border-box;margin:0;padding:0}
@@ -710,6 +1186,7 @@ body{font-family:-apple-system,BlinkMacSystemFont,'SF Pro Display','Helvetica Ne
 .src-tag{font-size:9px;font-weight:600;padding:1px 6px;border-radius:4px;margin-left:4px;white-space:nowrap}
 .src-tag.mob{background:#E8FAE6;color:#1B7A12}
 .src-tag.web{background:#E3F2FD;color:#0A5EB5}
+.src-tag.both{background:#F3E5F5;color:#7B1FA2}
 
 /* Alpha blocks — bigger */
 .al-row{display:flex;gap:6px;margin-bottom:14px;flex-wrap:wrap}
@@ -745,9 +1222,22 @@ body{font-family:-apple-system,BlinkMacSystemFont,'SF Pro Display','Helvetica Ne
 .cmp-scale{display:flex;gap:6px;margin-bottom:6px;flex-wrap:wrap}
 .cmp-sw{width:64px;height:44px;border-radius:10px;border:1px solid rgba(0,0,0,.06);display:flex;align-items:center;justify-content:center;font-size:12px;font-weight:700}
 .cmp-sw-label{font-size:10px;text-align:center;color:var(--t2);font-family:'SF Mono',Menlo,monospace;margin-top:3px}
+.cmp-sw.empty{background:transparent;border:2px dashed var(--brd);color:var(--t3)}
+.cmp-sw.mismatch{box-shadow:0 0 0 3px var(--rd)}
+.cmp-sw.close{box-shadow:0 0 0 3px var(--o)}
+.cmp-de{font-size:10px;text-align:center;font-weight:700;margin-top:2px}
+.cmp-de.match{color:var(--g)}
+.cmp-de.close{color:var(--o)}
+.cmp-de.mismatch{color:var(--rd)}
+.cmp-nc{font-size:10px;font-weight:600;color:var(--t3)}
 .placeholder-box{border:2px dashed var(--brd);border-radius:var(--r);padding:48px;text-align:center;color:var(--t3);font-size:15px}
 .badge-new{background:var(--g);color:#fff;padding:1px 5px;border-radius:3px;font-size:8px;font-weight:700}
 
+/* TAB 3: playground */
+.pg-input{width:100%;min-height:140px;padding:14px 16px;border:1px solid var(--brd);border-radius:var(--r);background:var(--card);box-shadow:var(--sh);font-family:'SF Mono',Menlo,monospace;font-size:13px;color:var(--text);resize:vertical}
+.pg-meta{font-size:12px;color:var(--t2);margin:10px 0 6px}
+.pg-ref{display:inline-block;width:10px;height:10px;border-radius:3px;border:1px solid rgba(0,0,0,.1);vertical-align:-1px;margin:0 3px}
+
 @media(max-width:900px){.stats{grid-template-columns:repeat(2,1fr)}.sc-row{grid-template-columns:repeat(3,1fr)}.cmp-row{grid-template-columns:1fr}}
 """
 
@@ -766,271 +1256,612 @@ function exportJSON(fname){
   a.download=fname+'.tokens.json';
   a.click();
 }
+// Playground: pgLab / pgDE mirror rgb_to_lab / delta_e_2000, pgMatch mirrors find_best + find_step
+// over the refs of playground_data(); tests/test_playground.py checks them against Python in node.
+function pgLab(hex){
+  var h=hex.replace('#','').slice(-6),v=[0,2,4].map(function(i){
+    var c=parseInt(h.substr(i,2),16)/255;return c<=0.04045?c/12.92:Math.pow((c+0.055)/1.055,2.4)});
+  function f(t){return t>0.008856?Math.pow(t,1/3):7.787*t+16/116}
+  var fx=f((v[0]*0.4124564+v[1]*0.3575761+v[2]*0.1804375)/0.95047),
+      fy=f((v[0]*0.2126729+v[1]*0.7151522+v[2]*0.0721750)/1.0),
+      fz=f((v[0]*0.0193339+v[1]*0.1191920+v[2]*0.9503041)/1.08883);
+  return [116*fy-16,500*(fx-fy),200*(fy-fz)];
+}
+function pgHue(b,a){var h=Math.atan2(b,a)*(180/Math.PI)%360;return h<0?h+360:h}
+function pgDE(p,q){
+  var R=Math.PI/180,P7=6103515625,L1=p[0],a1=p[1],b1=p[2],L2=q[0],a2=q[1],b2=q[2];
+  var aL=(L1+L2)/2,C1=Math.sqrt(a1*a1+b1*b1),C2=Math.sqrt(a2*a2+b2*b2),aC7=Math.pow((C1+C2)/2,7);
+  var G=0.5*(1-Math.sqrt(aC7/(aC7+P7))),a1p=a1*(1+G),a2p=a2*(1+G);
+  var C1p=Math.sqrt(a1p*a1p+b1*b1),C2p=Math.sqrt(a2p*a2p+b2*b2),aCp=(C1p+C2p)/2;
+  var h1p=pgHue(b1,a1p),h2p=pgHue(b2,a2p),aHp,dhp;
+  if(Math.abs(h1p-h2p)<=180) aHp=(h1p+h2p)/2; else if(h1p+h2p<360) aHp=(h1p+h2p+360)/2; else aHp=(h1p+h2p-360)/2;
+  var T=1-0.17*Math.cos((aHp-30)*R)+0.24*Math.cos(2*aHp*R)+0.32*Math.cos((3*aHp+6)*R)-0.20*Math.cos((4*aHp-63)*R);
+  if(Math.abs(h2p-h1p)<=180) dhp=h2p-h1p; else if(h2p-h1p>180) dhp=h2p-h1p-360; else dhp=h2p-h1p+360;
+  var dLp=L2-L1,dCp=C2p-C1p,dHp=2*Math.sqrt(C1p*C2p)*Math.sin(dhp/2*R),l50=(aL-50)*(aL-50);
+  var SL=1+0.015*l50/Math.sqrt(20+l50),SC=1+0.045*aCp,SH=1+0.015*aCp*T;
+  var dTh=30*Math.exp(-((aHp-275)/25)*((aHp-275)/25)),aCp7=Math.pow(aCp,7),RC=2*Math.sqrt(aCp7/(aCp7+P7)),RT=-RC*Math.sin(2*dTh*R);
+  return Math.sqrt((dLp/SL)*(dLp/SL)+(dCp/SC)*(dCp/SC)+(dHp/SH)*(dHp/SH)+RT*(dCp/SC)*(dHp/SH));
+}
+function pgMatch(hex,data){
+  var lab=pgLab(hex),best=null,bd=999,sd=999;
+  data.refs.forEach(function(r){var d=pgDE(lab,r.slice(3));if(d<bd){bd=d;best=r}});
+  var out={hex:hex,kind:best[0],name:best[1],ref:best[2],de:bd},steps=best[0]==='scale'&&data.steps[best[1]];
+  if(steps){steps.forEach(function(s){var d=pgDE(lab,s.slice(2));if(d<sd){sd=d;out.step=s[0];out.step_hex=s[1]}});out.step_de=sd}
+  return out;
+}
+function pgParse(text){
+  var out=[];
+  text.split('\\n').forEach(function(line){
+    var m=line.match(/#([0-9A-Fa-f]{8}|[0-9A-Fa-f]{6})\\b/),re=/\\b([0-9A-Fa-f]{8}|[0-9A-Fa-f]{6})\\b/g,b;
+    if(!m) while((b=re.exec(line))) m=b;   // no '#': the last bare hex, as in name,hex
+    if(m) out.push({hex:'#'+m[1].slice(-6).toUpperCase(),label:(line.slice(0,m.index)+line.slice(m.index+m[0].length)).replace(/^[\\s,;:=-]+|[\\s,;:=-]+$/g,'')});
+  });
+  return out;
+}
+var PG=null;
+function pgRun(){
+  PG=PG||JSON.parse(document.getElementById('pg-data').textContent);
+  var t0=performance.now(),rows=pgParse(document.getElementById('pg-input').value),html='';
+  function esc(s){return s.replace(/[&<>"]/g,function(c){return {'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'}[c]})}
+  rows.forEach(function(row){
+    var r=pgMatch(row.hex,PG),far=r.de>=PG.t.far,de=function(d){return d.toFixed(1)};
+    html+='<div class="lg'+(far?' far':'')+'"><div class="lg-sw" style="background:'+r.hex+'"></div><div class="lg-body">'
+      +'<div class="lg-n">'+(row.label?esc(row.label)+' ':'')+r.hex+' &rarr; '+esc(r.name)+(r.step?' '+r.step:'')+'</div>'
+      +'<div class="lg-d">ref<span class="pg-ref" style="background:'+r.ref+'"></span>'+r.ref+' '+(r.de<PG.t.exact?'exact':'ΔE '+de(r.de))
+      +(r.step?' · шаг '+r.step+'<span class="pg-ref" style="background:'+r.step_hex+'"></span>'+r.step_hex+' ΔE '+de(r.step_de):'')
+      +(far?'<span class="lg-far-tag">далёкий</span>':'')+'</div></div></div>';
+  });
+  document.getElementById('pg-out').innerHTML=html;
+  document.getElementById('pg-meta').textContent=rows.length?rows.length+' цв. · '+(performance.now()-t0).toFixed(1)+' мс':'';
+}
 """
 
-# Build JSON data for each family (Figma-compatible token format)
-family_jsons = {}
-for fname, fdata in SCALE_FAMILIES.items():
-    tokens = {}
-    final_solid = fdata.get("final_solid", {})
-    alpha_base = fdata.get("alpha_base")
-    alpha_existing = fdata.get("alpha_existing", {})
-    skip_solid = fdata.get("skip_solid_scale", False)
-
-    if final_solid and not skip_solid:
-        for s in STEPS:
-            tokens[f"{fname}_{s}"] = {"$type": "color", "$value": final_solid[s]["hex"]}
-    if alpha_base:
-        all_a = sorted(set(list(alpha_existing.keys()) + STEPS), reverse=True)
-        for s in all_a:
-            av = alpha_existing.get(s, s/100.0) if s in alpha_existing else s/100.0
-            ahex = alpha_base.lstrip('#')
-            alpha_int = round(av * 255)
-            tokens[f"{fname}_alpha_{s}"] = {"$type": "color", "$value": f"#{alpha_int:02X}{ahex}"}
-    family_jsons[fname] = tokens
+SOURCE_TAGS = {"web": ("web", "веб"), "mobile": ("mob", "мобилка"), "both": ("both", "веб + мобилка")}
 
-html = f"""<!DOCTYPE html>
+def source_tag(source):
+    cls, lbl = SOURCE_TAGS.get(source, SOURCE_TAGS["mobile"])
+    return f'<span class="src-tag {cls}">{lbl}</span>'
+
+# Build JSON data for each family (Figma-compatible token format)
+def iter_family_tokens(families=None):
+    """Yield (family, W3C-style tokens) one family at a time; alpha values are #AARRGGBB."""
+    families = SCALE_FAMILIES if families is None else families
+    for fname, fdata in families.items():
+        tokens = {}
+        final_solid = fdata["final_solid"]
+        alpha_base = fdata["alpha_base"]
+        alpha_existing = fdata["alpha_existing"]
+        skip_solid = fdata["skip_solid_scale"]
+
+        if final_solid and not skip_solid:
+            for s in STEPS:
+                tokens[f"{fname}_{s}"] = {"$type": "color", "$value": final_solid[s]["hex"]}
+        if alpha_base:
+            all_a = sorted(set(list(alpha_existing.keys()) + STEPS), reverse=True)
+            for s in all_a:
+                av = alpha_existing.get(s, s/100.0) if s in alpha_existing else s/100.0
+                ahex = alpha_base[1:]
+                alpha_int = round(av * 255)
+                tokens[f"{fname}_alpha_{s}"] = {"$type": "color", "$value": f"#{alpha_int:02X}{ahex}"}
+        yield fname, tokens
+
+def build_family_jsons(families=None):
+    if families is None:
+        return FAMILY_JSONS
+    return dict(iter_family_tokens(families))
+
+
+def delta_stats(deltas, thresholds=None):
+    """(exact, merged, far) counts of the header stats over an iterable of ΔE."""
+    t = METRIC.thresholds if thresholds is None else thresholds
+    exact = merged = far = 0
+    for d in deltas:
+        if d < t["exact"]: exact += 1
+        elif d < t["merged"]: merged += 1
+        if d >= t["far"]: far += 1
+    return exact, merged, far
+
+def _peek(items):
+    """None for an empty iterable, else an iterator over all of it."""
+    it = iter(items)
+    for first in it:
+        return chain([first], it)
+    return None
+
+class MatchView:
+    """What the renderers read: match results held in memory as (fam_legacy, other_legacy)."""
+
+    def __init__(self, fam_legacy, other_legacy, total=None):
+        self.fam_legacy, self.other_legacy = fam_legacy, other_legacy
+        self.total = TOTAL_INPUT if total is None else total
+        self.stats = delta_stats(i["delta"] for groups in (fam_legacy, other_legacy) for items in groups.values() for i in items)
+
+    def step_items(self, fname, s):
+        return sorted([i for i in self.fam_legacy.get(fname, []) if i.get("assigned_step")==s], key=lambda x: x.get("step_de",999))
+
+    def family_items(self, fname):
+        return sorted(self.fam_legacy.get(fname, []), key=lambda x: x["delta"])
+
+    def other_items(self, tname):
+        return sorted(self.other_legacy.get(tname, []), key=lambda x: x["delta"])
+
+    def far_items(self):
+        t = METRIC.thresholds["unmatched"]
+        far = [i for groups in (self.fam_legacy, self.other_legacy) for items in groups.values() for i in items if i["delta"] >= t]
+        return sorted(far, key=lambda x: -x["delta"])
+
+
+SECTIONS = ("families", "other", "unmatched")     # sections of the analysis tab
+TABS = OrderedDict([("analysis", "Анализ цветов"), ("compare", "Сравнение с вебом"), ("playground", "Проверить цвет")])
+
+def render_html(fam_legacy, other_legacy, web_cmp=None, families=None, sections=SECTIONS, tabs=tuple(TABS)):
+    """Report HTML. families / sections / tabs limit what is rendered; the stats always cover all colors."""
+    return "".join(iter_html(MatchView(fam_legacy, other_legacy), web_cmp, families, sections, tabs))
+
+
+def iter_html(view, web_cmp=None, families=None, sections=SECTIONS, tabs=tuple(TABS)):
+    """render_html as a stream of chunks; view supplies the matched entries (MatchView or a spilled one)."""
+    shown = SCALE_FAMILIES if families is None else OrderedDict((f, SCALE_FAMILIES[f]) for f in SCALE_FAMILIES if f in families)
+    family_jsons = build_family_jsons(None if families is None else shown) if "analysis" in tabs and "families" in sections else {}
+    if "compare" in tabs and web_cmp is None:
+        web_cmp = build_web_comparison(OrderedDict((f, d) for f, d in shown.items() if d["alpha_base"]))
+    yield f"""<!DOCTYPE html>
 <html lang="ru"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width,initial-scale=1">
 <title>Color Tokens — Final Palette</title>
 <style>{CSS}</style></head><body>
 
 <div class="hdr"><h1>Color Tokens — Final Palette</h1>
-<p>{TOTAL_INPUT} устаревших цветов &middot; {len(SCALE_FAMILIES)} семейств &middot; {len(OTHER_TOKENS)} токенов Other</p></div>
+<p>{view.total} устаревших цветов &middot; {len(SCALE_FAMILIES)} семейств &middot; {len(OTHER_TOKENS)} токенов Other{"" if METRIC.name == "de2000" else " &middot; метрика " + METRIC.label}</p></div>
 
 <div class="tabs-bar"><div class="tabs-inner">
-<button class="tab-btn active" onclick="switchTab(0)">Анализ цветов</button>
-<button class="tab-btn" onclick="switchTab(1)">Сравнение с вебом</button>
-</div></div>
-
-<!-- ===================== TAB 1: ANALYSIS ===================== -->
-<div class="tab-pane active" id="tab-analysis"><div class="c">
+"""
+    for i, tab in enumerate(tabs):
+        yield f'<button class="tab-btn{" active" if i == 0 else ""}" onclick="switchTab({i})">{TABS[tab]}</button>\n'
+    yield '</div></div>\n\n'
+    if "analysis" in tabs:
+        yield from iter_analysis_tab(view, shown, family_jsons, sections, active=tabs[0] == "analysis")
+    if "compare" in tabs:
+        yield from iter_compare_tab(web_cmp, shown, active=tabs[0] == "compare")
+    if "playground" in tabs:
+        yield from iter_playground_tab(active=tabs[0] == "playground")
+    yield f'<script>{JS}</script></body></html>'
+
+
+def iter_analysis_tab(view, shown, family_jsons, sections, active=True):
+    import json as _json
+    T = METRIC.thresholds
+    exact_c, merged_c, far_c = view.stats
+
+    yield f"""<!-- ===================== TAB 1: ANALYSIS ===================== -->
+<div class="tab-pane{" active" if active else ""}" id="tab-analysis"><div class="c">
 
 <div class="stats" style="margin-top:32px">
-<div class="st"><div class="st-n">{TOTAL_INPUT}</div><div class="st-l">Всего цветов</div></div>
+<div class="st"><div class="st-n">{view.total}</div><div class="st-l">Всего цветов</div></div>
 <div class="st"><div class="st-n" style="color:var(--g)">{exact_c}</div><div class="st-l">Exact Match</div></div>
-<div class="st"><div class="st-n" style="color:var(--bl)">{merged_c}</div><div class="st-l">Merged (ΔE&lt;5)</div></div>
-<div class="st"><div class="st-n" style="color:var(--o)">{far_c}</div><div class="st-l">Далёкие (ΔE≥10)</div></div>
+<div class="st"><div class="st-n" style="color:var(--bl)">{merged_c}</div><div class="st-l">Merged (ΔE&lt;{T["merged"]:g})</div></div>
+<div class="st"><div class="st-n" style="color:var(--o)">{far_c}</div><div class="st-l">Далёкие (ΔE≥{T["far"]:g})</div></div>
 </div>
 
 <div class="de-info">
 <h2>Что такое ΔE (Delta E)?</h2>
-<p>ΔE (Delta E 2000) — это международный стандарт измерения перцептивного различия между двумя цветами.
-Формула учитывает особенности человеческого зрения: преобразует цвета из sRGB → XYZ → CIE LAB (перцептивно-равномерное пространство),
-затем вычисляет разницу с поправками на яркость, насыщенность и оттенок.</p>
+<p>ΔE — мера перцептивного различия между двумя цветами; в этом отчёте — {METRIC.label}{" (CIEDE2000, международный стандарт)" if METRIC.name == "de2000" else ""}.
+Цвета переводятся из sRGB в перцептивно-равномерное пространство, и разница считается там с учётом особенностей человеческого зрения.
+Пороги ниже — те же, что в статистике выше.</p>
 <p>Чем <strong>меньше</strong> ΔE — тем <strong>ближе</strong> цвета друг к другу визуально.</p>
 <div class="de-scale">
-<div class="de-chip exact">ΔE &lt; 1 — Exact match, неразличимы</div>
-<div class="de-chip close">ΔE &lt; 5 — Очень близкие, можно объединить</div>
-<div class="de-chip mid">ΔE 5–10 — Заметно отличаются, но в одной семье</div>
-<div class="de-chip far">ΔE ≥ 10 — Далёкие, требуют решения</div>
+<div class="de-chip exact">ΔE &lt; {T["exact"]:g} — Exact match, неразличимы</div>
+<div class="de-chip close">ΔE &lt; {T["merged"]:g} — Очень близкие, можно объединить</div>
+<div class="de-chip mid">ΔE {T["merged"]:g}–{T["far"]:g} — Заметно отличаются, но в одной семье</div>
+<div class="de-chip far">ΔE ≥ {T["far"]:g} — Далёкие, требуют решения</div>
 </div>
 </div>
 """
 
-# ===== TAB 1: SCALE FAMILIES =====
-html += '<div class="section-title">Семейства со шкалой 100 → 10</div>\n'
-
-for fname, fdata in SCALE_FAMILIES.items():
-    items = fam_legacy.get(fname, [])
-    is_new = fdata.get("is_new", False)
-    skip_solid = fdata.get("skip_solid_scale", False)
-    final_solid = fdata.get("final_solid", {})
-    alpha_base = fdata.get("alpha_base")
-    alpha_existing = fdata.get("alpha_existing", {})
-    alpha_label = fdata.get("alpha_label", "")
-    also_alpha = fdata.get("also_alpha", [])
-    extra_tokens = fdata.get("extra_tokens", {})
-
-    strip_colors = []
-    if final_solid:
-        for s in STEPS: strip_colors.append(final_solid[s]["hex"])
-    elif alpha_base:
-        for s in STEPS: strip_colors.append(blend_on_white(alpha_base, s/100.0))
-
-    json_id = f"json-{fname}"
-    json_data = _json.dumps(family_jsons.get(fname, {}))
-
-    html += '<div class="fam">\n<div class="fam-top">\n<div class="fam-strip">'
-    for sc in strip_colors: html += f'<div class="fam-strip-sw" style="background:{sc}"></div>'
-    html += f'</div>\n<div class="fam-info"><div class="fam-name">{fname} {"<span class=new-tag>НОВОЕ</span>" if is_new else ""}</div><div class="fam-desc">{fdata["desc"]}</div></div>'
-    html += f'<button class="json-btn" onclick="exportJSON(\'{fname}\')">&#x2B73; JSON</button>'
-    html += f'<script type="application/json" id="{json_id}">{json_data}</script>'
-    html += '</div>\n'
-
-    # SOLID SCALE
-    if final_solid and not skip_solid:
-        html += '<div class="sc"><div class="sc-lbl">Шкала 100 → 10 (solid hex)</div><div class="sc-row">\n'
-        for s in STEPS:
-            sd = final_solid[s]; hx = sd["hex"]; is_ex = sd["src"]=="base"
-            tc = text_color(hx); box_cls = "" if is_ex else " proposed"
-            step_items = sorted([i for i in items if i.get("assigned_step")==s], key=lambda x: x.get("step_de",999))
-            html += f'<div class="sc-col"><div class="sw-box{box_cls}" style="background:{hx}"><div class="sw-main"><span class="sw-lbl" style="color:{tc}">{s}</span></div></div>'
-            html += f'<div class="sc-hex">{hx}</div><div class="sc-tag {"ex" if is_ex else "pr"}">{"из мобилки" if is_ex else "предложен"}</div>'
-            if step_items:
-                html += '<div class="lg-list">'
-                for si in step_items:
-                    cls = " dup" if si["is_dup"] else ""
-                    if si.get("step_de",0) >= 10: cls += " far"
-                    de_lbl = "exact" if si.get("step_de",99)<0.1 else f'ΔE {si.get("step_de","?")}'
-                    far_tag = '<span class="lg-far-tag">далёкий</span>' if si.get("step_de",0)>=10 else ""
-                    src_cls = "web" if si.get("source")=="web" else "mob"
-                    src_lbl = "веб" if si.get("source")=="web" else "мобилка"
-                    src_tag = f'<span class="src-tag {src_cls}">{src_lbl}</span>'
-                    html += f'<div class="lg{cls}" title="{si["note"]}"><div class="lg-sw" style="background:{si["hex"]}"></div><div class="lg-body"><div class="lg-n">{si["name"]}{src_tag}</div><div class="lg-d">{si["hex"]} {de_lbl}{far_tag}</div></div></div>'
-                html += '</div>'
-            html += '</div>\n'
-        html += '</div></div>\n'
-
-    # ALPHA SCALE
-    if alpha_base:
-        all_steps = sorted(set(list(alpha_existing.keys()) + STEPS), reverse=True)
-        html += '<div class="sep"></div><div class="sc">'
-        html += f'<div class="sc-lbl"><span class="al-base-sw" style="background:{alpha_base}"></span>{alpha_label} — альфа ({alpha_base})</div><div class="al-row">'
-        for s in all_steps:
-            is_ex = s in alpha_existing and alpha_existing[s] is not None
-            av = alpha_existing.get(s) if is_ex else (s/100.0)
+    # ===== TAB 1: SCALE FAMILIES =====
+    if "families" in sections:
+        yield '<div class="section-title">Семейства со шкалой 100 → 10</div>\n'
+
+    for fname, fdata in (shown.items() if "families" in sections else ()):
+        is_new = fdata["is_new"]
+        skip_solid = fdata["skip_solid_scale"]
+        final_solid = fdata["final_solid"]
+        alpha_base = fdata["alpha_base"]
+        alpha_existing = fdata["alpha_existing"]
+        alpha_label = fdata["alpha_label"]
+        also_alpha = fdata["also_alpha"]
+        extra_tokens = fdata["extra_tokens"]
+
+        strip_colors = []
+        if final_solid:
+            for s in STEPS: strip_colors.append(final_solid[s]["hex"])
+        elif alpha_base:
+            for s in STEPS: strip_colors.append(blend_on_white(alpha_base, s/100.0))
+
+        json_id = f"json-{fname}"
+        json_data = _json.dumps(family_jsons.get(fname, {}))
+
+        yield '<div class="fam">\n<div class="fam-top">\n<div class="fam-strip">'
+        for sc in strip_colors: yield f'<div class="fam-strip-sw" style="background:{sc}"></div>'
+        yield f'</div>\n<div class="fam-info"><div class="fam-name">{fname} {"<span class=new-tag>НОВОЕ</span>" if is_new else ""}</div><div class="fam-desc">{fdata["desc"]}</div></div>'
+        yield f'<button class="json-btn" onclick="exportJSON(\'{fname}\')">&#x2B73; JSON</button>'
+        yield f'<script type="application/json" id="{json_id}">{json_data}</script>'
+        yield '</div>\n'
+
+        # SOLID SCALE
+        if final_solid and not skip_solid:
+            yield '<div class="sc"><div class="sc-lbl">Шкала 100 → 10 (solid hex)</div><div class="sc-row">\n'
+            for s in STEPS:
+                sd = final_solid[s]; hx = sd["hex"]; is_ex = sd["src"]=="base"
+                tc = text_color(hx); box_cls = "" if is_ex else " proposed"
+                step_items = _peek(view.step_items(fname, s))
+                yield f'<div class="sc-col"><div class="sw-box{box_cls}" style="background:{hx}"><div class="sw-main"><span class="sw-lbl" style="color:{tc}">{s}</span></div></div>'
+                yield f'<div class="sc-hex">{hx}</div><div class="sc-tag {"ex" if is_ex else "pr"}">{"из мобилки" if is_ex else "предложен"}</div>'
+                if step_items:
+                    yield '<div class="lg-list">'
+                    for si in step_items:
+                        cls = " dup" if si["is_dup"] else ""
+                        if si.get("step_de",0) >= T["far"]: cls += " far"
+                        de_lbl = "exact" if si.get("step_de",99)<T["exact"] else f'ΔE {si.get("step_de","?")}'
+                        far_tag = '<span class="lg-far-tag">далёкий</span>' if si.get("step_de",0)>=T["far"] else ""
+                        src_tag = source_tag(si["source"])
+                        yield f'<div class="lg{cls}" title="{si["note"]}"><div class="lg-sw" style="background:{si["hex"]}"></div><div class="lg-body"><div class="lg-n">{si["name"]}{src_tag}</div><div class="lg-d">{si["hex"]} {de_lbl}{far_tag}</div></div></div>'
+                    yield '</div>'
+                yield '</div>\n'
+            yield '</div></div>\n'
+
+        # ALPHA SCALE
+        if alpha_base:
+            all_steps = sorted(set(list(alpha_existing.keys()) + STEPS), reverse=True)
+            yield '<div class="sep"></div><div class="sc">'
+            yield f'<div class="sc-lbl"><span class="al-base-sw" style="background:{alpha_base}"></span>{alpha_label} — альфа ({alpha_base})</div><div class="al-row">'
+            for s in all_steps:
+                is_ex = s in alpha_existing and alpha_existing[s] is not None
+                av = alpha_existing.get(s) if is_ex else (s/100.0)
+                bl = blend_on_white(alpha_base, av)
+                sw_cls = "" if is_ex else " proposed"
+                yield f'<div class="al-col"><div class="al-sw{sw_cls}" style="background:{bl}"></div><div class="al-num">{s}</div><div class="al-val">@ {int(av*100)}%</div>'
+                if not is_ex: yield '<div class="sc-tag pr">NEW</div>'
+                yield '</div>'
+            yield '</div>'
+            for (albl, ahex, asteps) in also_alpha:
+                yield f'<div class="sc-lbl" style="margin-top:8px"><span class="al-base-sw" style="background:{ahex}"></span>{albl} — альфа ({ahex})</div><div class="al-row">'
+                for s2 in sorted(asteps.keys(), reverse=True):
+                    bl2 = blend_on_white(ahex, asteps[s2])
+                    yield f'<div class="al-col"><div class="al-sw" style="background:{bl2}"></div><div class="al-num">{s2}</div><div class="al-val">@ {int(asteps[s2]*100)}%</div></div>'
+                yield '</div>'
+            yield '</div>\n'
+
+        # EXTRA TOKENS
+        if extra_tokens:
+            et_reason = fdata["extra_tokens_reason"]
+            yield '<div class="sep"></div><div class="sc"><div class="sc-lbl">Отдельные токены</div>'
+            if et_reason:
+                yield f'<p style="font-size:12px;color:var(--t2);margin-bottom:12px;line-height:1.5">{et_reason}</p>'
+            yield '<div class="ex-row">'
+            for k, h in extra_tokens.items():
+                yield f'<div class="ex-chip"><div class="ex-sw" style="background:{h}"></div><span class="ex-nm">{k}</span><span class="ex-hx">{h}</span></div>'
+            yield '</div></div>\n'
+
+        # For families with skip_solid_scale or without solid: show all legacy
+        if skip_solid or not final_solid:
+            items = _peek(view.family_items(fname))
+            if items:
+                yield '<div class="sep"></div><div class="sc"><div class="sc-lbl">Устаревшие цвета → это семейство</div><div class="lg-list">'
+                for item in items:
+                    cls = " dup" if item["is_dup"] else ""
+                    if item["delta"]>=T["far"]: cls += " far"
+                    de_lbl = "exact" if item["delta"]<T["exact"] else f'ΔE {item["delta"]}'
+                    far_tag = '<span class="lg-far-tag">далёкий</span>' if item["delta"]>=T["far"] else ""
+                    src_tag = source_tag(item["source"])
+                    yield f'<div class="lg{cls}"><div class="lg-sw" style="background:{item["hex"]}"></div><div class="lg-body"><div class="lg-n">{item["name"]}{src_tag}</div><div class="lg-d">{item["hex"]} {de_lbl}{far_tag}</div></div></div>'
+                yield '</div></div>\n'
+
+        yield '</div>\n\n'
+
+    # ===== OTHER GROUP =====
+    if "other" in sections:
+        yield from iter_other_section(view)
+    if "unmatched" in sections:
+        yield from iter_unmatched_section(view)
+
+    yield '</div></div>\n\n'  # close .c and #tab-analysis
+
+
+def iter_other_section(view):
+    T = METRIC.thresholds
+    yield '<div class="section-title">Other — одиночные Core-токены</div>\n'
+    yield '<div class="fam"><div class="fam-top"><div class="fam-info"><div class="fam-name">Other</div><div class="fam-desc">Цвета из Core без шкалы 100→10. Одиночные токены.</div></div></div>\n'
+    yield '<div class="sc"><div class="other-grid">'
+    for tname, thex in OTHER_TOKENS.items():
+        items = _peek(view.other_items(tname))
+        yield f'<div class="other-block"><div class="other-main"><div class="other-sw-lg" style="background:{thex}"></div><div><div class="other-name">{tname}</div><div class="other-hex">{thex}</div></div></div>'
+        if items:
+            yield '<div class="lg-list">'
+            for it in items:
+                cls = " dup" if it["is_dup"] else ""
+                if it["delta"]>=T["far"]: cls += " far"
+                de_lbl = "exact" if it["delta"]<T["exact"] else f'ΔE {it["delta"]}'
+                far_tag = '<span class="lg-far-tag">далёкий</span>' if it["delta"]>=T["far"] else ""
+                src_tag = source_tag(it["source"])
+                yield f'<div class="lg{cls}"><div class="lg-sw" style="background:{it["hex"]}"></div><div class="lg-body"><div class="lg-n">{it["name"]}{src_tag}</div><div class="lg-d">{it["hex"]} {de_lbl}{far_tag}</div></div></div>'
+            yield '</div>'
+        yield '</div>'
+    yield '</div></div></div>\n\n'
+
+
+def iter_unmatched_section(view):
+    T = METRIC.thresholds
+    all_far = _peek(view.far_items())
+
+    if all_far:
+        yield f'<div class="section-title" style="color:var(--rd)">Unmatched — далёкие от всех семейств (ΔE ≥ {T["unmatched"]:g})</div>\n'
+        yield '<div class="fam" style="border-left:4px solid var(--rd)"><div class="sc"><div class="sc-lbl" style="color:var(--rd)">Требуют отдельного решения</div>'
+        yield '<div class="lg-list">'
+        for item in all_far:
+            src_tag = source_tag(item["source"])
+            yield f'<div class="lg far"><div class="lg-sw" style="background:{item["hex"]}"></div><div class="lg-body"><div class="lg-n">{item["name"]}{src_tag}</div><div class="lg-d">{item["hex"]} ΔE {item["delta"]}<span class="lg-far-tag">ΔE≥{T["unmatched"]:g}</span></div></div></div>'
+        yield '</div></div></div>\n'
+
+
+def iter_compare_tab(web_cmp, shown, active=False):
+    # ===================== TAB 2: COMPARISON WITH WEB (ALPHA ONLY) =====================
+    yield f'<div class="tab-pane{" active" if active else ""}" id="tab-compare"><div class="c">\n'
+    yield '<div class="section-title" style="margin-top:32px">Альфа-палитра — Apps vs Web</div>\n'
+    yield f'<p style="color:var(--t2);margin-bottom:24px;font-size:14px">Левая колонка — альфа-цвета приложений (solid-on-white эквивалент). Правая — веб-палитра по тем же шагам: шаг Cross, а для семейства без Cross — ближайший из его веб-цветов (ΔE ≤ {WEB_MATCH_DE:g}); подсвечены расхождения.</p>\n'
+
+    for fname, fdata in shown.items():
+        alpha_base = fdata["alpha_base"]
+        if not alpha_base:
+            continue  # Skip families without alpha
+        alpha_existing = fdata["alpha_existing"]
+        alpha_label = fdata["alpha_label"]
+        also_alpha = fdata["also_alpha"]
+        is_new = fdata["is_new"]
+
+        yield '<div class="cmp-row">\n'
+
+        # LEFT: App alpha palette
+        yield '<div class="cmp-col"><div class="cmp-col-hdr app">Apps — ' + fname + (' <span class="badge-new">NEW</span>' if is_new else '') + '</div><div class="cmp-body">\n'
+
+        all_alpha_steps = sorted(set(list(alpha_existing.keys()) + STEPS), reverse=True)
+        yield f'<div class="cmp-fam"><div class="cmp-fam-name">{alpha_label} {alpha_base}</div>'
+        yield '<div class="cmp-scale">'
+        for s in all_alpha_steps:
+            av = alpha_existing.get(s, s/100.0) if s in alpha_existing else s/100.0
             bl = blend_on_white(alpha_base, av)
-            sw_cls = "" if is_ex else " proposed"
-            html += f'<div class="al-col"><div class="al-sw{sw_cls}" style="background:{bl}"></div><div class="al-num">{s}</div><div class="al-val">@ {int(av*100)}%</div>'
-            if not is_ex: html += '<div class="sc-tag pr">NEW</div>'
-            html += '</div>'
-        html += '</div>'
+            tc = text_color(bl)
+            yield f'<div><div class="cmp-sw" style="background:{bl};color:{tc}">{s}</div><div class="cmp-sw-label">{bl}<br>@{int(av*100)}%</div></div>'
+        yield '</div></div>\n'
+
         for (albl, ahex, asteps) in also_alpha:
-            html += f'<div class="sc-lbl" style="margin-top:8px"><span class="al-base-sw" style="background:{ahex}"></span>{albl} — альфа ({ahex})</div><div class="al-row">'
+            yield f'<div class="cmp-fam"><div class="cmp-fam-name">{albl} {ahex} <span class="cmp-nc">не сравнивается с вебом</span></div>'
+            yield '<div class="cmp-scale">'
             for s2 in sorted(asteps.keys(), reverse=True):
                 bl2 = blend_on_white(ahex, asteps[s2])
-                html += f'<div class="al-col"><div class="al-sw" style="background:{bl2}"></div><div class="al-num">{s2}</div><div class="al-val">@ {int(asteps[s2]*100)}%</div></div>'
-            html += '</div>'
-        html += '</div>\n'
-
-    # EXTRA TOKENS
-    if extra_tokens:
-        et_reason = fdata.get("extra_tokens_reason", "")
-        html += '<div class="sep"></div><div class="sc"><div class="sc-lbl">Отдельные токены</div>'
-        if et_reason:
-            html += f'<p style="font-size:12px;color:var(--t2);margin-bottom:12px;line-height:1.5">{et_reason}</p>'
-        html += '<div class="ex-row">'
-        for k, h in extra_tokens.items():
-            html += f'<div class="ex-chip"><div class="ex-sw" style="background:{h}"></div><span class="ex-nm">{k}</span><span class="ex-hx">{h}</span></div>'
-        html += '</div></div>\n'
-
-    # For families with skip_solid_scale or without solid: show all legacy
-    if skip_solid or not final_solid:
-        if items:
-            html += '<div class="sep"></div><div class="sc"><div class="sc-lbl">Устаревшие цвета → это семейство</div><div class="lg-list">'
-            for item in sorted(items, key=lambda x: x["delta"]):
-                cls = " dup" if item["is_dup"] else ""
-                if item["delta"]>=10: cls += " far"
-                de_lbl = "exact" if item["delta"]<0.1 else f'ΔE {item["delta"]}'
-                far_tag = '<span class="lg-far-tag">далёкий</span>' if item["delta"]>=10 else ""
-                src_cls = "web" if item.get("source")=="web" else "mob"
-                src_lbl = "веб" if item.get("source")=="web" else "мобилка"
-                src_tag = f'<span class="src-tag {src_cls}">{src_lbl}</span>'
-                html += f'<div class="lg{cls}"><div class="lg-sw" style="background:{item["hex"]}"></div><div class="lg-body"><div class="lg-n">{item["name"]}{src_tag}</div><div class="lg-d">{item["hex"]} {de_lbl}{far_tag}</div></div></div>'
-            html += '</div></div>\n'
-
-    html += '</div>\n\n'
-
-# ===== OTHER GROUP =====
-html += '<div class="section-title">Other — одиночные Core-токены</div>\n'
-html += '<div class="fam"><div class="fam-top"><div class="fam-info"><div class="fam-name">Other</div><div class="fam-desc">Цвета из Core без шкалы 100→10. Одиночные токены.</div></div></div>\n'
-html += '<div class="sc"><div class="other-grid">'
-for tname, thex in OTHER_TOKENS.items():
-    items = other_legacy.get(tname, [])
-    html += f'<div class="other-block"><div class="other-main"><div class="other-sw-lg" style="background:{thex}"></div><div><div class="other-name">{tname}</div><div class="other-hex">{thex}</div></div></div>'
-    if items:
-        html += '<div class="lg-list">'
-        for it in sorted(items, key=lambda x: x["delta"]):
-            cls = " dup" if it["is_dup"] else ""
-            if it["delta"]>=10: cls += " far"
-            de_lbl = "exact" if it["delta"]<0.1 else f'ΔE {it["delta"]}'
-            far_tag = '<span class="lg-far-tag">далёкий</span>' if it["delta"]>=10 else ""
-            src_cls = "web" if it.get("source")=="web" else "mob"
-            src_lbl = "веб" if it.get("source")=="web" else "мобилка"
-            src_tag = f'<span class="src-tag {src_cls}">{src_lbl}</span>'
-            html += f'<div class="lg{cls}"><div class="lg-sw" style="background:{it["hex"]}"></div><div class="lg-body"><div class="lg-n">{it["name"]}{src_tag}</div><div class="lg-d">{it["hex"]} {de_lbl}{far_tag}</div></div></div>'
-        html += '</div>'
-    html += '</div>'
-html += '</div></div></div>\n\n'
-
-# ===== UNMATCHED =====
-all_far = []
-for items_list in fam_legacy.values():
-    for i in items_list:
-        if i["delta"] >= 15: all_far.append(i)
-for items_list in other_legacy.values():
-    for i in items_list:
-        if i["delta"] >= 15: all_far.append(i)
-all_far.sort(key=lambda x: -x["delta"])
-
-if all_far:
-    html += '<div class="section-title" style="color:var(--rd)">Unmatched — далёкие от всех семейств (ΔE ≥ 15)</div>\n'
-    html += '<div class="fam" style="border-left:4px solid var(--rd)"><div class="sc"><div class="sc-lbl" style="color:var(--rd)">Требуют отдельного решения</div>'
-    html += '<div class="lg-list">'
-    for item in all_far:
-        src_cls = "web" if item.get("source")=="web" else "mob"
-        src_lbl = "веб" if item.get("source")=="web" else "мобилка"
-        src_tag = f'<span class="src-tag {src_cls}">{src_lbl}</span>'
-        html += f'<div class="lg far"><div class="lg-sw" style="background:{item["hex"]}"></div><div class="lg-body"><div class="lg-n">{item["name"]}{src_tag}</div><div class="lg-d">{item["hex"]} ΔE {item["delta"]}<span class="lg-far-tag">ΔE≥15</span></div></div></div>'
-    html += '</div></div></div>\n'
-
-html += '</div></div>\n\n'  # close .c and #tab-analysis
-
-# ===================== TAB 2: COMPARISON WITH WEB (ALPHA ONLY) =====================
-html += '<div class="tab-pane" id="tab-compare"><div class="c">\n'
-html += '<div class="section-title" style="margin-top:32px">Альфа-палитра — Apps vs Web</div>\n'
-html += '<p style="color:var(--t2);margin-bottom:24px;font-size:14px">Левая колонка — альфа-цвета приложений (solid-on-white эквивалент). Правая — веб-палитра (скинь цвета, и я заполню).</p>\n'
-
-for fname, fdata in SCALE_FAMILIES.items():
-    alpha_base = fdata.get("alpha_base")
-    if not alpha_base:
-        continue  # Skip families without alpha
-    alpha_existing = fdata.get("alpha_existing", {})
-    alpha_label = fdata.get("alpha_label", "")
-    also_alpha = fdata.get("also_alpha", [])
-    is_new = fdata.get("is_new", False)
-
-    html += '<div class="cmp-row">\n'
-
-    # LEFT: App alpha palette
-    html += '<div class="cmp-col"><div class="cmp-col-hdr app">Apps — ' + fname + (' <span class="badge-new">NEW</span>' if is_new else '') + '</div><div class="cmp-body">\n'
-
-    all_alpha_steps = sorted(set(list(alpha_existing.keys()) + STEPS), reverse=True)
-    html += f'<div class="cmp-fam"><div class="cmp-fam-name">{alpha_label} {alpha_base}</div>'
-    html += '<div class="cmp-scale">'
-    for s in all_alpha_steps:
-        av = alpha_existing.get(s, s/100.0) if s in alpha_existing else s/100.0
-        bl = blend_on_white(alpha_base, av)
-        tc = text_color(bl)
-        html += f'<div><div class="cmp-sw" style="background:{bl};color:{tc}">{s}</div><div class="cmp-sw-label">{bl}<br>@{int(av*100)}%</div></div>'
-    html += '</div></div>\n'
-
-    for (albl, ahex, asteps) in also_alpha:
-        html += f'<div class="cmp-fam"><div class="cmp-fam-name">{albl} {ahex}</div>'
-        html += '<div class="cmp-scale">'
-        for s2 in sorted(asteps.keys(), reverse=True):
-            bl2 = blend_on_white(ahex, asteps[s2])
-            tc2 = text_color(bl2)
-            html += f'<div><div class="cmp-sw" style="background:{bl2};color:{tc2}">{s2}</div><div class="cmp-sw-label">{bl2}<br>@{int(asteps[s2]*100)}%</div></div>'
-        html += '</div></div>\n'
-
-    html += '</div></div>\n'
-
-    # RIGHT: Web palette (placeholder)
-    html += '<div class="cmp-col"><div class="cmp-col-hdr web">Web — ' + fname + '</div><div class="cmp-body">\n'
-    html += '<div class="placeholder-box">Скинь веб-палитру,<br>и я заполню эту колонку</div>\n'
-    html += '</div></div>\n'
-
-    html += '</div>\n'
-
-html += '</div></div>\n'  # close .c and #tab-compare
-
-html += f'<script>{JS}</script></body></html>'
-
-for p in ["/tmp/color_analysis/color_consolidation.html"]:
+                tc2 = text_color(bl2)
+                yield f'<div><div class="cmp-sw" style="background:{bl2};color:{tc2}">{s2}</div><div class="cmp-sw-label">{bl2}<br>@{int(asteps[s2]*100)}%</div></div>'
+            yield '</div></div>\n'
+
+        yield '</div></div>\n'
+
+        # RIGHT: Web palette, aligned by step
+        cmp = web_cmp[fname]
+        yield '<div class="cmp-col"><div class="cmp-col-hdr web">Web — ' + fname + (f' ({cmp["cross_name"]})' if cmp["cross_name"] else '') + '</div><div class="cmp-body">\n'
+        if cmp["max_de"] is None:
+            yield '<div class="placeholder-box">В веб-палитре нет близких цветов</div>\n'
+        else:
+            yield f'<div class="cmp-fam"><div class="cmp-fam-name">ΔE макс. {cmp["max_de"]} · средн. {cmp["mean_de"]}</div>'
+            yield '<div class="cmp-scale">'
+            for r in cmp["steps"]:
+                if r["web"] is None:
+                    label = "нет шага в Cross" if r["status"] == "unaligned" else "нет"
+                    yield f'<div><div class="cmp-sw empty">{r["step"]}</div><div class="cmp-sw-label">{label}</div></div>'
+                    continue
+                cls = f' {r["status"]}' if r["status"] in ("close", "mismatch") else ""
+                yield f'<div><div class="cmp-sw{cls}" style="background:{r["web"]};color:{text_color(r["web"])}">{r["step"]}</div><div class="cmp-sw-label">{r["web"]}<br>{r["web_source"]}</div>'
+                yield f'<div class="cmp-de {r["status"]}">{"=" if r["de"] < 0.1 else "ΔE " + str(r["de"])}</div></div>'
+            yield '</div></div>\n'
+        yield '</div></div>\n'
+
+        yield '</div>\n'
+
+    yield '</div></div>\n'  # close .c and #tab-compare
+
+
+def playground_data(families=None, index=None):
+    """What the playground tab's JS matches against: refs in find_best order and the final_solid
+    steps of each family, with full-precision Lab, plus the ΔE2000 thresholds for its tags."""
+    families = SCALE_FAMILIES if families is None else families
+    index = REF_INDEX if index is None else index
+    return {
+        "refs": [[kind, name, ref, *hex_lab(ref)] for kind, name, ref, _ in index],
+        "steps": {fname: [[s, fdata["final_solid"][s]["hex"], *hex_lab(fdata["final_solid"][s]["hex"])] for s in STEPS]
+                  for fname, fdata in families.items() if fdata["final_solid"]},
+        "t": METRICS["de2000"].thresholds,
+    }
+
+def iter_playground_tab(active=False):
+    # ===================== TAB 3: PLAYGROUND (matching in the browser) =====================
+    import json as _json
+    yield f'<div class="tab-pane{" active" if active else ""}" id="tab-playground"><div class="c">\n'
+    yield '<div class="section-title" style="margin-top:32px">Проверить цвет</div>\n'
+    yield ('<p style="color:var(--t2);margin-bottom:16px;font-size:14px">Вставьте цвета — по одному в строке, можно с названием. '
+           'Каждый сопоставляется прямо в браузере так же, как в generate.py: ближайший эталон по ΔE2000 и ближайший шаг его семейства'
+           + ('' if METRIC.name == "de2000" else f' (отчёт построен по метрике {METRIC.label}, здесь — ΔE2000)') + '.</p>\n')
+    yield '<textarea id="pg-input" class="pg-input" placeholder="#0D99F6&#10;button_bg #FF6170" oninput="pgRun()"></textarea>\n'
+    yield '<div id="pg-meta" class="pg-meta"></div><div id="pg-out" class="lg-list"></div>\n'
+    data = _json.dumps(playground_data(), ensure_ascii=False).replace("</", "<\\/")
+    yield f'<script type="application/json" id="pg-data">{data}</script>\n'
+    yield '</div></div>\n'  # close .c and #tab-playground
+
+
+# ============================================================
+# PRECOMPILED REFERENCES: everything derived from the definitions, built once per hash
+# ============================================================
+# The normalized data, final_solid, provenance, ref coordinates and family tokens
+# change only with the definitions, so they are saved under a hash of them and
+# loaded at import. Changed definitions get a new hash and are built (and
+# validated) again on the next import. The file is marshal, not pickle: pickle
+# imports re and struct, which cost more than the whole load, and a one-hex
+# lookup should not pay for them. json is imported only where a report is written.
+# The cache lives in a per-user directory, and a file not owned by the user or
+# writable by others is ignored, so nobody else can plant references in it.
+
+REFS_CACHE_DIR = (os.environ.get("COLOR_REVIEW_CACHE")
+                  or os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "color_review"))
+REFS_VERSION = 1          # bump when the layout of the marshal file changes
+
+def source_hash():
+    """crc32 of this file: any change to the code deriving the references is a new key."""
+    with open(__file__, "rb") as f:
+        return f"{zlib.crc32(f.read()):08x}"
+
+def refs_key(raw):
+    """The raw definitions (families, others, legacy, css_vars), the metric, the source hash and REFS_VERSION as one string."""
+    return repr((REFS_VERSION, METRIC.name, source_hash()) + tuple(raw))
+
+def build_refs(families, others, legacy, css_vars):
+    """Raw definitions -> (families, others, legacy, css_vars, provenance, ref index, family tokens).
+    Duplicate keys in this file's dict literals are errors too: the cache key covers the source,
+    so the check runs once per change of it."""
+    dups = find_duplicate_keys(__file__)
+    if dups:
+        raise PaletteError(f"{len(dups)} palette error(s):\n  " + "\n  ".join(dups))
+    families, others, legacy = normalize_palette(families, others, legacy)
+    build_final_solid(families)
+    css_vars = [(v, norm_hex(h, f"WEB_CSS_VARS {v}")) for v, h in css_vars]
+    return (families, others, legacy, css_vars, build_provenance(families, others, legacy, css_vars),
+            build_ref_index(families, others), build_family_jsons(families))
+
+def trusted_cache_file(f):
+    """The open cache file is owned by the current user and not writable by group or others
+    (refs here, the nearest-token table in lut.py)."""
+    st = os.fstat(f.fileno())
+    return (not hasattr(os, "getuid") or st.st_uid == os.getuid()) and not st.st_mode & 0o022
+
+def load_refs(raw, cache_dir=None):
+    """build_refs(*raw), read from <cache_dir>/refs_<crc32 of refs_key>.<python tag>.marshal
+    (cache_dir defaults to REFS_CACHE_DIR); built and saved on a miss. The file keeps the full
+    key too, so a crc32 collision is a miss."""
+    cache_dir = REFS_CACHE_DIR if cache_dir is None else cache_dir
+    key = refs_key(raw)
+    path = os.path.join(cache_dir, f"refs_{zlib.crc32(key.encode('utf-8')):08x}.{sys.implementation.cache_tag}.marshal")
+    try:
+        with open(path, "rb") as f:
+            if not trusted_cache_file(f):
+                raise OSError(f"untrusted cache file: {path}")
+            cached_key, (families, others, legacy, css_vars, provenance, index, tokens) = marshal.load(f)
+        if cached_key == key:
+            # marshal has plain dicts only
+            return (OrderedDict(families), OrderedDict(others), legacy, css_vars,
+                    defaultdict(list, provenance), index, tokens)
+    except Exception:
+        pass        # missing, unreadable or untrusted: rebuild
+    refs = build_refs(*raw)
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            marshal.dump((key, tuple(dict(r) if isinstance(r, dict) else r for r in refs)), f)
+        os.chmod(tmp, 0o600)    # whatever the umask, trusted_cache_file accepts it on the next import
+        os.replace(tmp, path)
+    except OSError:
+        pass        # a read-only cache only costs the rebuild
+    return refs
+
+try:
+    (SCALE_FAMILIES, OTHER_TOKENS, LEGACY, WEB_CSS_VARS,
+     PROVENANCE, REF_INDEX, FAMILY_JSONS) = load_refs((SCALE_FAMILIES, OTHER_TOKENS, LEGACY, WEB_CSS_VARS))
+except PaletteError as e:
+    if __name__ == "__main__":
+        raise SystemExit(f"error: {e}")     # the CLI handler at the bottom is not defined yet
+    raise
+
+OUT_PATHS = ["/tmp/color_analysis/color_consolidation.html"]
+WEB_CMP_PATH = "/tmp/color_analysis/web_compare.json"
+
+def _csv(choices, what):
+    import argparse
+    def parse(value):
+        items = [v.strip() for v in value.split(",") if v.strip()]
+        bad = [v for v in items if v not in choices]
+        if bad:
+            raise argparse.ArgumentTypeError(f"unknown {what}: {', '.join(bad)} (one of: {', '.join(choices)})")
+        return items
+    return parse
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Color consolidation report.")
+    parser.add_argument("--family", "-f", action="append", type=_csv(list(SCALE_FAMILIES), "family"), default=[],
+                        help="render only these families (comma-separated or repeated)")
+    parser.add_argument("--section", "-s", action="append", type=_csv(SECTIONS, "section"), default=[],
+                        help="analysis tab sections: " + ", ".join(SECTIONS))
+    parser.add_argument("--tab", "-t", action="append", type=_csv(list(TABS), "tab"), default=[],
+                        help="tabs: " + ", ".join(TABS))
+    parser.add_argument("--out", "-o", help="output HTML path (default: " + ", ".join(OUT_PATHS) + ")")
+    parser.add_argument("--legacy", help="legacy colors from a .csv / .jsonl export instead of the built-in LEGACY")
+    parser.add_argument("--metric", "-m", choices=list(METRICS), default="de2000",
+                        help="ΔE metric for matching, steps and the report bins")
+    parser.add_argument("--stream", action="store_true",
+                        help="bounded memory: match row by row, spill entries to temp files, write HTML in chunks (stream.py)")
+    args = parser.parse_args(argv)
+    args.family = [f for group in args.family for f in group] or None
+    args.section = tuple(x for x in SECTIONS if any(x in group for group in args.section)) or SECTIONS
+    args.tab = tuple(x for x in TABS if any(x in group for group in args.tab)) or tuple(TABS)
+    return args
+
+def main(argv=None):
+    import json as _json
+    args = parse_args(argv)
+    if args.metric != METRIC.name:
+        set_metric(args.metric)
+    # steps are only needed for families whose blocks are rendered
+    rendered = args.family if "analysis" in args.tab and "families" in args.section else ()
+    only = None if rendered is None else set(rendered)
+    if args.stream:
+        from stream import iter_legacy_file, match_stream
+        view, in_fam, in_other = match_stream(iter_legacy_file(args.legacy) if args.legacy else LEGACY,
+                                              only=only, sections=args.section)
+    else:
+        if args.legacy:
+            from stream import iter_legacy_file
+        legacy = list(iter_legacy_file(args.legacy)) if args.legacy else LEGACY
+        fam_legacy, other_legacy = match_legacy(legacy, only=only)
+        view = MatchView(fam_legacy, other_legacy, len(legacy))
+        in_fam, in_other = sum(len(v) for v in fam_legacy.values()), sum(len(v) for v in other_legacy.values())
+    print(f"Всего цветов во входных данных: {view.total}")
+    TOTAL_OUTPUT = in_fam + in_other
+    print(f"Распределено: {TOTAL_OUTPUT} (семейства: {in_fam}, other: {in_other})")
+    assert TOTAL_OUTPUT == view.total, f"ПОТЕРЯНЫ ЦВЕТА! {view.total} != {TOTAL_OUTPUT}"
+    print("✓ Все цвета на месте!")
+
+    full = args.family is None and "compare" in args.tab
+    web_cmp = build_web_comparison() if full else None
+    try:
+        for p in [args.out] if args.out else OUT_PATHS:
+            try:
+                size = 0
+                with open(p, "w", encoding="utf-8") as f:
+                    for chunk in iter_html(view, web_cmp, args.family, args.section, args.tab):
+                        f.write(chunk); size += len(chunk)
+                print(f"Written: {p} ({size} bytes)")
+            except Exception as e:
+                print(f"SKIP {p}: {e}")
+    finally:
+        if args.stream:
+            view.close()
+    if not full:
+        return      # a partial run does not overwrite the drift-tracking JSON
     try:
-        with open(p, "w", encoding="utf-8") as f:
-            f.write(html)
-        print(f"Written: {p} ({len(html)} bytes)")
+        with open(WEB_CMP_PATH, "w", encoding="utf-8") as f:
+            _json.dump(web_cmp, f, ensure_ascii=False, indent=1)
+        print(f"Written: {WEB_CMP_PATH}")
     except Exception as e:
-        print(f"SKIP {p}: {e}")
+        print(f"SKIP {WEB_CMP_PATH}: {e}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except PaletteError as e:
+        raise SystemExit(f"error: {e}")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Precompiled nearest-token table for the whole 24-bit RGB cube.
+
+With fixed refs, find_best depends only on the RGB value, so the answer for all
+16.7M colors is stored in a memory-mapped file and a lookup is two array reads.
+
+Build (NumPy): the cube is cut into cells of STEP levels. At each cell center the
+nearest ref and its ΔE are computed, along with the reach: how far the cell's colors
+get from the center. Only refs within 2 * reach of the center's nearest can be the
+nearest anywhere in the cell. A cell with one such candidate takes it; every other
+cell (a boundary) is solved per color against its candidates. Refs and ΔE are exact.
+
+File: <CACHE_DIR>/lut_<refs hash>.bin = uint8 ref index[2^24] + uint16 ΔE*100[2^24],
+with the ref list next to it in .json. A changed ref set, metric or code has a new
+hash, so the table is rebuilt on the next open_lut(); so is a file that is not the
+user's own (see generate.trusted_cache_file).
+
+    python3 lut.py [hex ...]
+"""
+
+import hashlib, mmap, os, struct, sys, time, json as _json
+
+import generate as g
+
+CACHE_DIR = g.REFS_CACHE_DIR
+STEP = 4                  # coarse grid spacing in 8-bit levels
+MARGIN = 1.5              # safety factor on the ΔE reach of a cell from its center
+N = 1 << 24
+DE_SCALE = 100            # ΔE stored as uint16 hundredths
+CHUNK = 1 << 20
+
+def refs_hash(index=None):
+    """Hash of the refs, the metric and the code behind the table (generate.py's ΔE, this file's build)."""
+    index = g.REF_INDEX if index is None else index
+    with open(__file__, "rb") as f:
+        code = [g.source_hash(), hashlib.sha256(f.read()).hexdigest()[:16]]
+    return hashlib.sha256(_json.dumps([g.METRIC.name] + code + [list(r[:3]) for r in index]).encode()).hexdigest()[:16]
+
+def lut_path(index=None):
+    return os.path.join(CACHE_DIR, f"lut_{refs_hash(index)}.bin")
+
+# ============================================================
+# BUILD
+# ============================================================
+
+def _nearest(np, lab, ref_lab, chunk=CHUNK):
+    """(argmin ref, min ΔE) for every row of lab, first ref wins ties like find_best."""
+    best_i = np.empty(len(lab), dtype=np.uint8)
+    best_d = np.empty(len(lab))
+    for lo in range(0, len(lab), chunk):
+        part = lab[lo:lo + chunk]
+        d = np.stack([g.METRIC.batch(part, r) for r in ref_lab], axis=1)
+        best_i[lo:lo + chunk] = d.argmin(axis=1)
+        best_d[lo:lo + chunk] = d.min(axis=1)
+    return best_i, best_d
+
+def _lab_of(np, codes):
+    return g.METRIC.to_coords_batch(np.stack([(codes >> 16) & 255, (codes >> 8) & 255, codes & 255], axis=1))
+
+def build_lut(path=None, index=None, step=STEP, verbose=False):
+    import numpy as np
+    index = g.REF_INDEX if index is None else index
+    path = lut_path(index) if path is None else path
+    if len(index) > 255:
+        raise ValueError(f"{len(index)} refs do not fit a uint8 table")
+    t0 = time.perf_counter()
+    ref_lab = np.array([r[3] for r in index])
+    n_cells = 256 // step
+    # every cell is anchored at its center; reach is the farthest its colors get from it (ΔE to
+    # the 8 extreme colors of the cell, with MARGIN for ΔE not growing linearly inside the cell)
+    lo = np.arange(n_cells) * step
+    grid = lambda v: np.stack([a.ravel() for a in np.meshgrid(v, v, v, indexing="ij")], axis=1)
+    center = g.METRIC.to_coords_batch(grid(lo + (step - 1) / 2))
+    reach = np.zeros(len(center))
+    for dr in (0, step - 1):
+        for dg in (0, step - 1):
+            for db in (0, step - 1):
+                ext = g.METRIC.to_coords_batch(grid(lo) + (dr, dg, db))
+                reach = np.maximum(reach, g.METRIC.batch(center, ext))
+    reach *= MARGIN
+    # candidate refs per cell: for a color x of the cell, d(x, j) >= d(center, j) - reach and
+    # d(x, nearest) <= d(center, nearest) + reach, so a ref more than 2 * reach behind the
+    # center's nearest is never the nearest inside the cell
+    _, center_d = _nearest(np, center, ref_lab)
+    cand = np.stack([g.METRIC.batch(center, r) - center_d <= 2 * reach for r in ref_lab], axis=1)
+    cand = cand.reshape(n_cells, n_cells, n_cells, len(index))
+    del center, center_d, reach
+    uniform = cand.sum(axis=3) == 1
+    # per color: its cell's only candidate, solved per color below for boundary cells
+    codes = np.arange(N, dtype=np.int64)
+    cell = (((codes >> 16) & 255) // step, ((codes >> 8) & 255) // step, (codes & 255) // step)
+    idx = cand.argmax(axis=3).astype(np.uint8)[cell]
+    boundary = ~uniform[cell]
+    del codes, cell
+    de = np.empty(N, dtype=np.uint16)
+    for lo in range(0, N, CHUNK):
+        sl = slice(lo, lo + CHUNK)
+        codes = np.arange(lo, min(lo + CHUNK, N), dtype=np.int64)
+        lab = _lab_of(np, codes)
+        b = np.nonzero(boundary[sl])[0]
+        if len(b):
+            bc = codes[b]
+            cmask = cand[((bc >> 16) & 255) // step, ((bc >> 8) & 255) // step, (bc & 255) // step]
+            best_i = np.zeros(len(b), dtype=np.uint8)
+            best_d = np.full(len(b), np.inf)
+            for i in range(len(index)):        # ref order + strict < keeps find_best's first-wins ties
+                rows = np.nonzero(cmask[:, i])[0]
+                if not len(rows):
+                    continue
+                d = g.METRIC.batch(lab[b[rows]], ref_lab[i])
+                better = d < best_d[rows]
+                best_d[rows[better]] = d[better]; best_i[rows[better]] = i
+            part = idx[sl]; part[b] = best_i; idx[sl] = part
+        d = g.METRIC.batch(lab, ref_lab[idx[sl]])
+        de[sl] = np.minimum(np.round(d * DE_SCALE), 65535).astype(np.uint16)
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(idx.tobytes())
+        f.write(de.astype("<u2").tobytes())
+    meta = os.path.splitext(path)[0] + ".json"
+    with open(meta + ".tmp", "w", encoding="utf-8") as f:
+        _json.dump({"metric": g.METRIC.name, "refs": [list(r[:3]) for r in index], "step": step}, f, ensure_ascii=False)
+    for name in (tmp, meta + ".tmp"):
+        os.chmod(name, 0o600)       # Lut only opens files that are not writable by others
+    os.replace(meta + ".tmp", meta)
+    os.replace(tmp, path)
+    if verbose:
+        print(f"Built {path}: {boundary.mean():.1%} of colors in boundary cells, {time.perf_counter() - t0:.1f}s")
+    return path
+
+# ============================================================
+# LOOKUP
+# ============================================================
+
+class Lut:
+    """Memory-mapped table: lookup(hex) -> ((kind, name), ref, ΔE), same shape as find_best."""
+
+    def __init__(self, path, index):
+        self.path = path
+        self.refs = [r[:3] for r in index]
+        with open(path, "rb") as f:
+            if not g.trusted_cache_file(f):
+                raise ValueError(f"{path}: not owned by this user or writable by others")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mm) != 3 * N:
+            size = len(self.mm)
+            self.mm.close()
+            raise ValueError(f"{path}: unexpected size {size}")
+
+    def lookup_rgb(self, r, g_, b):
+        c = (r << 16) | (g_ << 8) | b
+        kind, name, ref = self.refs[self.mm[c]]
+        return (kind, name), ref, struct.unpack_from("<H", self.mm, N + 2 * c)[0] / DE_SCALE
+
+    def lookup(self, hex_color):
+        return self.lookup_rgb(*g.hex_to_rgb(hex_color))
+
+    def lookup_many(self, rgb):
+        """(N,3) ints -> (ref index array, ΔE array) via NumPy views of the same map."""
+        import numpy as np
+        rgb = np.asarray(rgb, dtype=np.int64)
+        c = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+        idx = np.frombuffer(self.mm, dtype=np.uint8, count=N)
+        de = np.frombuffer(self.mm, dtype="<u2", count=N, offset=N)
+        return idx[c], de[c] / DE_SCALE
+
+    def close(self):
+        self.mm.close()
+
+def open_lut(index=None, verbose=False):
+    """Open the table for the current refs, building it first if the refs hash has no table yet
+    or the file there is untrusted or broken."""
+    index = g.REF_INDEX if index is None else index
+    path = lut_path(index)
+    if os.path.exists(path):
+        try:
+            return Lut(path, index)
+        except ValueError:
+            pass        # rebuilt below
+    build_lut(path, index, verbose=verbose)
+    return Lut(path, index)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    lut = open_lut(verbose=True)
+    for h in argv:
+        best, ref, d = lut.lookup(h)
+        print(f"{h}: {best[0]}:{best[1]} ref {ref} ΔE {d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""OKLCH scale engine - alternative to generate_scale's sRGB blend on white.
+
+Each step keeps the base hue: lightness is interpolated from the base towards white
+in OKLCH, chroma shrinks with it, and colors outside sRGB are pulled back in by
+lowering chroma at constant L and h. All families x steps are solved as one batch
+(NumPy if installed, plain Python otherwise).
+
+    python3 oklch_scale.py      # ΔE of both engines against existing_solid
+"""
+
+import math, sys, json as _json
+from collections import OrderedDict
+
+import generate as g
+
+GAMUT_ITERS = 20   # chroma bisection steps; 2^-20 of the base chroma is far below one 8-bit level
+GAMUT_EPS = 1e-6
+
+# ============================================================
+# OKLAB (Björn Ottosson) - scalar
+# ============================================================
+
+def linear_to_oklab(r, g_, b):
+    l = 0.4122214708*r + 0.5363325363*g_ + 0.0514459929*b
+    m = 0.2119034982*r + 0.6806995451*g_ + 0.1073969566*b
+    s = 0.0883024619*r + 0.2817188376*g_ + 0.6299787005*b
+    l_, m_, s_ = (math.copysign(abs(v) ** (1/3), v) for v in (l, m, s))
+    return (0.2104542553*l_ + 0.7936177850*m_ - 0.0040720468*s_,
+            1.9779984951*l_ - 2.4285922050*m_ + 0.4505937099*s_,
+            0.0259040371*l_ + 0.7827717662*m_ - 0.8086757660*s_)
+
+OKLAB_M1 = [[0.4122214708, 0.5363325363, 0.0514459929],
+            [0.2119034982, 0.6806995451, 0.1073969566],
+            [0.0883024619, 0.2817188376, 0.6299787005]]
+OKLAB_M2 = [[0.2104542553, 0.7936177850, -0.0040720468],
+            [1.9779984951, -2.4285922050, 0.4505937099],
+            [0.0259040371, 0.7827717662, -0.8086757660]]
+
+def linear_to_oklab_batch(lin):
+    """(N,3) linear sRGB -> (N,3) OKLab."""
+    import numpy as np
+    return np.cbrt(np.asarray(lin, dtype=float) @ np.array(OKLAB_M1).T) @ np.array(OKLAB_M2).T
+
+def oklab_to_linear(L, a, b):
+    l = (L + 0.3963377774*a + 0.2158037573*b) ** 3
+    m = (L - 0.1055613458*a - 0.0638541728*b) ** 3
+    s = (L - 0.0894841775*a - 1.2914855480*b) ** 3
+    return (4.0767416621*l - 3.3077115913*m + 0.2309699292*s,
+            -1.2684380046*l + 2.6097574011*m - 0.3413193965*s,
+            -0.0041960863*l - 0.7034186147*m + 1.7076147010*s)
+
+def hex_to_oklch(h):
+    L, a, b = linear_to_oklab(*(g.srgb_to_linear(c) for c in g.hex_to_rgb(h)))
+    return L, math.hypot(a, b), math.atan2(b, a)
+
+def _in_gamut(rgb):
+    return all(-GAMUT_EPS <= c <= 1 + GAMUT_EPS for c in rgb)
+
+def _step_targets(base_lch, steps):
+    """(L, C, h) of every step before gamut mapping: L towards white, C towards 0."""
+    L0, C0, h0 = base_lch
+    return [(1 - t * (1 - L0), C0 * t, h0) for t in (s / 100.0 for s in steps)]
+
+def oklch_to_hex_mapped(L, C, h):
+    """OKLCH -> hex, bisecting chroma down until the color fits sRGB."""
+    rgb = oklab_to_linear(L, C * math.cos(h), C * math.sin(h))
+    if not _in_gamut(rgb):
+        lo, hi = 0.0, C
+        for _ in range(GAMUT_ITERS):
+            mid = (lo + hi) / 2
+            if _in_gamut(oklab_to_linear(L, mid * math.cos(h), mid * math.sin(h))): lo = mid
+            else: hi = mid
+        rgb = oklab_to_linear(L, lo * math.cos(h), lo * math.sin(h))
+    return g.rgb_to_hex(*(g.linear_to_srgb(c) for c in rgb))
+
+def generate_scale_oklch(base_hex):
+    """Drop-in for generate.generate_scale: {step: hex} via OKLCH lightness interpolation."""
+    return {s: oklch_to_hex_mapped(*t) for s, t in zip(g.STEPS, _step_targets(hex_to_oklch(base_hex), g.STEPS))}
+
+# ============================================================
+# BATCH: all bases x steps at once
+# ============================================================
+
+def _scales_numpy(np, bases):
+    rgb = np.array([g.hex_to_rgb(h) for h in bases], dtype=float) / 255.0
+    lin = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    M1, M2 = np.array(OKLAB_M1), np.array(OKLAB_M2)
+    lab = linear_to_oklab_batch(lin)
+    L0, C0, h0 = lab[:, 0], np.hypot(lab[:, 1], lab[:, 2]), np.arctan2(lab[:, 2], lab[:, 1])
+    t = np.array(g.STEPS, dtype=float) / 100.0
+    # (bases, steps) grids, flattened into one solve
+    L = (1 - t[None, :] * (1 - L0[:, None])).ravel()
+    C = (C0[:, None] * t[None, :]).ravel()
+    h = np.broadcast_to(h0[:, None], (len(bases), len(t))).ravel()
+    cos_h, sin_h = np.cos(h), np.sin(h)
+    I1 = np.linalg.inv(M2)
+    I2 = np.linalg.inv(M1)
+
+    def to_linear(c):
+        lms_ = np.stack([L, c * cos_h, c * sin_h], axis=1) @ I1.T
+        return (lms_ ** 3) @ I2.T
+
+    def fits(lin_):
+        return np.all((lin_ >= -GAMUT_EPS) & (lin_ <= 1 + GAMUT_EPS), axis=1)
+
+    lo, hi = np.zeros_like(C), C.copy()
+    ok = fits(to_linear(C))
+    lo[ok] = C[ok]
+    for _ in range(GAMUT_ITERS):
+        mid = (lo + hi) / 2
+        f = fits(to_linear(mid)) | ok
+        lo = np.where(f, mid, lo)
+        hi = np.where(f, hi, mid)
+    out = to_linear(np.where(ok, C, lo))
+    out = np.clip(out, 0, 1)
+    srgb = np.where(out <= 0.0031308, 12.92 * out, 1.055 * out ** (1 / 2.4) - 0.055)
+    ints = np.floor(srgb * 255 + 0.5).astype(int).reshape(len(bases), len(t), 3)
+    return [{s: g.rgb_to_hex(*(int(v) for v in ints[i, j])) for j, s in enumerate(g.STEPS)} for i in range(len(bases))]
+
+def generate_scales_oklch(bases):
+    """[{step: hex}] for every base hex, solved as a single vectorized batch when NumPy is available."""
+    try:
+        import numpy as np
+    except ImportError:
+        return [generate_scale_oklch(b) for b in bases]
+    return _scales_numpy(np, list(bases))
+
+# ============================================================
+# ENGINE REPORT: ΔE of generated steps vs existing_solid
+# ============================================================
+
+def compare_engines(families=None):
+    families = g.SCALE_FAMILIES if families is None else families
+    names = [f for f, fd in families.items() if not fd.get("skip_solid_scale")]
+    oklch = generate_scales_oklch(families[f]["base_100"] for f in names)
+    report = OrderedDict()
+    for fname, ok_scale in zip(names, oklch):
+        fdata = families[fname]
+        blend = g.generate_scale(fdata["base_100"])
+        steps = OrderedDict()
+        for s in g.STEPS:
+            row = {"blend": blend[s], "oklch": ok_scale[s]}
+            if s in fdata.get("existing_solid", {}):
+                ex = fdata["existing_solid"][s]
+                row["existing"] = ex
+                row["de_blend"] = round(g.delta_e_2000(g.hex_lab(blend[s]), g.hex_lab(ex)), 2)
+                row["de_oklch"] = round(g.delta_e_2000(g.hex_lab(ok_scale[s]), g.hex_lab(ex)), 2)
+            steps[s] = row
+        scored = [r for r in steps.values() if "existing" in r]
+        report[fname] = {
+            "steps": steps,
+            "mean_de_blend": round(sum(r["de_blend"] for r in scored) / len(scored), 2) if scored else None,
+            "mean_de_oklch": round(sum(r["de_oklch"] for r in scored) / len(scored), 2) if scored else None,
+        }
+    return report
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    report = compare_engines()
+    print(f"{'family':<16}{'blend ΔE':>10}{'oklch ΔE':>10}")
+    for fname, r in report.items():
+        if r["mean_de_blend"] is not None:
+            print(f"{fname:<16}{r['mean_de_blend']:>10}{r['mean_de_oklch']:>10}")
+    p = argv[0] if argv else "/tmp/color_analysis/oklch_scales.json"
+    try:
+        with open(p, "w", encoding="utf-8") as f:
+            _json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Written: {p}")
+    except Exception as e:
+        print(f"SKIP {p}: {e}")
+
+if __name__ == "__main__":
+    main()
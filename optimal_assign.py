@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Optimal legacy -> step assignment (min-cost flow with step capacities).
+
+The greedy pass in generate.py sends each legacy color to its nearest final_solid
+step, so distinct colors can pile onto one step. Here every family is solved as a
+transportation problem: distinct legacy colors x STEPS, cost = ΔE, each step holds
+at most `capacity` distinct colors, total ΔE is minimal.
+
+Rows are added one at a time and routed along the shortest augmenting path
+(Hungarian-style successive shortest paths). With only len(STEPS) sinks the
+residual graph between steps is tiny, so a row costs O(k^3 + k^2 log n) and
+families with thousands of members solve in well under a second.
+
+    python3 optimal_assign.py [capacity]     # optimal vs greedy ΔE per family
+"""
+
+import heapq, math, sys
+
+def solve(costs, caps):
+    """costs: [[cost per step]] per row, caps: [capacity per step] -> [step index per row]."""
+    k = len(caps)
+    if sum(caps) < len(costs):
+        raise ValueError(f"capacity {sum(caps)} < {len(costs)} colors")
+    at = [None] * len(costs)        # step index of every placed row
+    load = [0] * k
+    # moves[a][b]: heap of (cost of moving row from a to b, row); stale rows are skipped lazily
+    moves = [[[] for _ in range(k)] for _ in range(k)]
+
+    def top(a, b):
+        h = moves[a][b]
+        while h and at[h[0][1]] != a:
+            heapq.heappop(h)
+        return h[0] if h else None
+
+    def place(i, b):
+        at[i] = b
+        row = costs[i]
+        for c in range(k):
+            if c != b:
+                heapq.heappush(moves[b][c], (row[c] - row[b], i))
+
+    for i, row in enumerate(costs):
+        # Bellman-Ford over steps; residual graph has no negative cycles as the placement so far is optimal
+        dist = list(row)
+        pred = [None] * k           # (previous step, row moved out of it) or None = new row enters here
+        for _ in range(k - 1):
+            changed = False
+            for a in range(k):
+                if load[a] == 0:
+                    continue
+                for b in range(k):
+                    if a == b:
+                        continue
+                    t = top(a, b)
+                    if t is not None and dist[a] + t[0] < dist[b] - 1e-12:
+                        dist[b] = dist[a] + t[0]; pred[b] = (a, t[1]); changed = True
+            if not changed:
+                break
+        end = min((b for b in range(k) if load[b] < caps[b]), key=lambda b: dist[b])
+        load[end] += 1
+        b = end
+        while pred[b] is not None:
+            a, j = pred[b]
+            place(j, b)
+            b = a
+        place(i, b)
+    return at
+
+def step_capacities(n, steps, capacity=None):
+    """capacity: None (spread evenly), int per step, or {step: int}."""
+    if capacity is None:
+        capacity = math.ceil(n / len(steps)) if steps else 0
+    if isinstance(capacity, dict):
+        return [capacity.get(s, 0) for s in steps]
+    return [capacity] * len(steps)
+
+def assign_optimal(entries, final, steps, de_fn, capacity=None):
+    """Rewrite assigned_step / step_de of one family's entries with the optimal assignment.
+
+    Duplicate hexes are one color: they share a slot and follow its step.
+    Returns (greedy total ΔE, optimal total ΔE) over distinct colors.
+    """
+    hexes = list(dict.fromkeys(e["hex"] for e in entries))
+    costs = [[de_fn(h, final[s]["hex"]) for s in steps] for h in hexes]
+    at = solve(costs, step_capacities(len(hexes), steps, capacity))
+    greedy = sum(min(row) for row in costs)
+    optimal = sum(row[j] for row, j in zip(costs, at))
+    row_of = {h: i for i, h in enumerate(hexes)}
+    for e in entries:
+        i = row_of[e["hex"]]
+        e["assigned_step"] = steps[at[i]]
+        e["step_de"] = round(costs[i][at[i]], 1)
+    return greedy, optimal
+
+def main(argv=None):
+    import copy, generate as g
+    argv = sys.argv[1:] if argv is None else argv
+    capacity = int(argv[0]) if argv else None
+    fam_legacy, _ = g.match_legacy()
+    de_fn = g.metric_de
+    print(f"{'family':<16}{'colors':>8}{'greedy ΔE':>12}{'optimal ΔE':>12}{'moved':>7}")
+    for fname, fdata in g.SCALE_FAMILIES.items():
+        entries = fam_legacy.get(fname)
+        final = fdata["final_solid"]
+        if not entries or not final:
+            continue
+        opt = copy.deepcopy(entries)
+        try:
+            greedy, optimal = assign_optimal(opt, final, g.STEPS, de_fn, capacity)
+        except ValueError as e:
+            print(f"SKIP {fname}: {e}")
+            continue
+        moved = sum(1 for a, b in zip(entries, opt) if a["assigned_step"] != b["assigned_step"])
+        print(f"{fname:<16}{len(set(e['hex'] for e in entries)):>8}{greedy:>12.1f}{optimal:>12.1f}{moved:>7}")
+
+if __name__ == "__main__":
+    main()
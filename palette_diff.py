@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Palette diff - which legacy assignments move between two reference versions.
+
+    python3 palette_diff.py OLD [NEW]
+    python3 palette_diff.py --dump snapshot.json
+
+OLD / NEW is either a revision of generate.py (git show HEAD~1:generate.py > old.py)
+or a JSON snapshot written by --dump. NEW defaults to the current generate.py.
+Only colors that a changed ref can affect are rematched against NEW.
+"""
+
+import ast, copy, sys, json as _json
+from collections import OrderedDict
+
+import generate as g
+
+OUT_DIR = "/tmp/color_analysis"
+
+# ============================================================
+# LOADING A PALETTE VERSION
+# ============================================================
+
+def _int_keys(obj):
+    """JSON turns step keys (100, 80, ...) into strings - turn them back."""
+    if isinstance(obj, dict):
+        return OrderedDict((int(k) if isinstance(k, str) and k.isdigit() else k, _int_keys(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return [_int_keys(v) for v in obj]
+    return obj
+
+def _literal_from_source(tree, name):
+    """Value of a top-level `NAME = OrderedDict([...])` assignment, without executing the file."""
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            value = node.value
+            if isinstance(value, ast.Call) and value.args:
+                value = value.args[0]
+            return OrderedDict(ast.literal_eval(value))
+    raise ValueError(f"{name} not found")
+
+def load_version(path=None):
+    """(families, others) for a generate.py revision, a JSON snapshot, or the current tree if path is None."""
+    if path is None:
+        families, others = copy.deepcopy(g.SCALE_FAMILIES), copy.deepcopy(g.OTHER_TOKENS)
+    elif path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = _json.load(f, object_pairs_hook=OrderedDict)
+        families, others = _int_keys(data["scale_families"]), OrderedDict(data["other_tokens"])
+    else:
+        dups = g.find_duplicate_keys(path)
+        if dups:
+            raise g.PaletteError(f"{len(dups)} palette error(s):\n  " + "\n  ".join(dups))
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        families, others = _literal_from_source(tree, "SCALE_FAMILIES"), _literal_from_source(tree, "OTHER_TOKENS")
+    families, others, _ = g.normalize_palette(families, others)
+    return g.build_final_solid(families), others
+
+def dump_version(path):
+    families = OrderedDict((n, {k: v for k, v in fd.items() if k != "final_solid"}) for n, fd in g.SCALE_FAMILIES.items())
+    with open(path, "w", encoding="utf-8") as f:
+        _json.dump({"scale_families": families, "other_tokens": g.OTHER_TOKENS}, f, ensure_ascii=False, indent=2)
+
+# ============================================================
+# INCREMENTAL REMATCH
+# ============================================================
+
+def _scale_of(families, fname):
+    fdata = families.get(fname)
+    if not fdata or not fdata["final_solid"]:
+        return None
+    return tuple(fdata["final_solid"][s]["hex"] for s in g.STEPS)
+
+def _group(entry_best):
+    return f"{entry_best[0]}:{entry_best[1]}"
+
+def diff_versions(old, new, legacy=None):
+    """Match legacy against OLD fully, then rematch against NEW only where a ref change can matter.
+
+    A color is rematched when its old best ref is gone, or an added ref is at least as
+    close as its old best. Its step is recomputed when its family's final_solid changed.
+    """
+    legacy = g.LEGACY if legacy is None else legacy
+    old_fams, old_others = old
+    new_fams, new_others = new
+    old_index = g.build_ref_index(old_fams, old_others)
+    new_index = g.build_ref_index(new_fams, new_others)
+    old_keys = [r[:3] for r in old_index]
+    new_keys = [r[:3] for r in new_index]
+    removed = set(old_keys) - set(new_keys)
+    added = [r for r in new_index if r[:3] not in set(old_keys)]
+    # find_best keeps the first of equal minima, so a reorder can move ties - rematch everything then
+    reordered = [k for k in old_keys if k not in removed] != [k for k in new_keys if k in set(old_keys)]
+    changed_scales = {f for f in set(old_fams) | set(new_fams) if _scale_of(old_fams, f) != _scale_of(new_fams, f)}
+
+    rows = []
+    rematched = 0
+    for lname, lhex, lnote in legacy:
+        best, ref, delta = g.find_best(lhex, old_index)
+        old_entry = g.make_entry(lname, lhex, lnote, best, ref, delta, old_fams)
+        old_best = best
+        rerun = reordered or (best[0], best[1], ref) in removed
+        if not rerun:
+            coords = g.hex_coords(lhex)
+            rerun = any(g.METRIC.scalar(coords, r[3]) <= delta for r in added)
+        if rerun:
+            rematched += 1
+            best, ref, delta = g.find_best(lhex, new_index)
+        if rerun or (best[0] == "scale" and best[1] in changed_scales):
+            new_entry = g.make_entry(lname, lhex, lnote, best, ref, delta, new_fams)
+        else:
+            new_entry = old_entry
+        moved = _group(old_best) != _group(best) or old_entry.get("assigned_step") != new_entry.get("assigned_step")
+        if moved or (new_entry is not old_entry and (old_entry["delta"] != new_entry["delta"] or old_entry.get("step_de") != new_entry.get("step_de"))):
+            rows.append({
+                "name": lname, "hex": lhex, "moved": moved,
+                "old": {"group": _group(old_best), "ref": old_entry["ref"], "delta": old_entry["delta"],
+                        "step": old_entry.get("assigned_step"), "step_de": old_entry.get("step_de")},
+                "new": {"group": _group(best), "ref": new_entry["ref"], "delta": new_entry["delta"],
+                        "step": new_entry.get("assigned_step"), "step_de": new_entry.get("step_de")},
+                "d_delta": round(new_entry["delta"] - old_entry["delta"], 1),
+            })
+    rows.sort(key=lambda r: (not r["moved"], -abs(r["d_delta"])))
+    return {
+        "summary": {
+            "colors": len(legacy), "rematched": rematched, "moved": sum(1 for r in rows if r["moved"]),
+            "de_changed": sum(1 for r in rows if not r["moved"]),
+            "refs_added": [list(r[:3]) for r in added], "refs_removed": sorted(list(k) for k in removed),
+            "families_added": [f for f in new_fams if f not in old_fams],
+            "families_removed": [f for f in old_fams if f not in new_fams],
+            "scales_changed": sorted(f for f in changed_scales if f in old_fams and f in new_fams),
+        },
+        "rows": rows,
+    }
+
+# ============================================================
+# REPORT
+# ============================================================
+
+def _side(side):
+    step = f' · {side["step"]} (ΔE {side["step_de"]})' if side["step"] is not None else ""
+    return f'{side["group"]}{step} · ref {side["ref"]} · ΔE {side["delta"]}'
+
+def render_diff_html(report):
+    s = report["summary"]
+    html = f"""<!DOCTYPE html>
+<html lang="ru"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width,initial-scale=1">
+<title>Color Tokens — Palette Diff</title>
+<style>{g.CSS}</style></head><body>
+<div class="hdr"><h1>Palette Diff</h1>
+<p>{s["colors"]} устаревших цветов &middot; перематчено {s["rematched"]}</p></div>
+<div class="c">
+<div class="stats" style="margin-top:32px">
+<div class="st"><div class="st-n">{len(s["refs_added"])}</div><div class="st-l">Refs добавлено</div></div>
+<div class="st"><div class="st-n" style="color:var(--rd)">{len(s["refs_removed"])}</div><div class="st-l">Refs удалено</div></div>
+<div class="st"><div class="st-n" style="color:var(--o)">{s["moved"]}</div><div class="st-l">Переназначено</div></div>
+<div class="st"><div class="st-n" style="color:var(--bl)">{s["de_changed"]}</div><div class="st-l">Изменился ΔE</div></div>
+</div>
+"""
+    for title, key in [("Новые семейства", "families_added"), ("Удалённые семейства", "families_removed"), ("Изменённые шкалы", "scales_changed")]:
+        if s[key]:
+            html += f'<p style="font-size:14px;color:var(--t2);margin-bottom:8px"><strong>{title}:</strong> {", ".join(s[key])}</p>\n'
+    html += '<div class="section-title">Изменения назначений</div>\n'
+    html += '<div class="fam"><div class="sc"><div class="lg-list">'
+    if not report["rows"]:
+        html += '<div class="placeholder-box">Назначения не изменились</div>'
+    for r in report["rows"]:
+        cls = " far" if r["moved"] else ""
+        tag = '<span class="lg-far-tag">moved</span>' if r["moved"] else ""
+        html += f'<div class="lg{cls}"><div class="lg-sw" style="background:{r["hex"]}"></div><div class="lg-body"><div class="lg-n">{r["name"]} {r["hex"]}{tag}</div>'
+        html += f'<div class="lg-d">было: {_side(r["old"])}</div><div class="lg-d">стало: {_side(r["new"])} (ΔΔE {r["d_delta"]:+})</div></div></div>'
+    html += '</div></div></div>\n</div></body></html>'
+    return html
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 2 and argv[0] == "--dump":
+        dump_version(argv[1])
+        print(f"Written: {argv[1]}")
+        return
+    if not 1 <= len(argv) <= 2:
+        print(__doc__)
+        sys.exit(2)
+    old = load_version(argv[0])
+    new = load_version(argv[1] if len(argv) == 2 else None)
+    report = diff_versions(old, new)
+    s = report["summary"]
+    print(f"Перематчено: {s['rematched']}/{s['colors']}, переназначено: {s['moved']}, изменился ΔE: {s['de_changed']}")
+    for name, text in [("palette_diff.json", _json.dumps(report, ensure_ascii=False, indent=2)), ("palette_diff.html", render_diff_html(report))]:
+        p = f"{OUT_DIR}/{name}"
+        try:
+            with open(p, "w", encoding="utf-8") as f:
+                f.write(text)
+            print(f"Written: {p} ({len(text)} bytes)")
+        except Exception as e:
+            print(f"SKIP {p}: {e}")
+
+if __name__ == "__main__":
+    main()
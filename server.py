@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""In-process HTTP API over generate.py with warm state (stdlib asyncio, keep-alive).
+
+    python3 server.py [port] [--lut] [--metric NAME]  # default 8765; --lut answers /match from lut.py's table
+
+GET  /match?hex=%230D99F6                  POST /match   {"hexes": [...]}
+GET  /scale?base=%23FF6170[&engine=oklch]  POST /scale   {"bases": [...], "engine": "blend"}
+                                           POST /de      {"pairs": [["#..", "#.."], ...]}
+GET  /source?hex=%23FF6170[&max_de=1]      POST /source  {"hexes": [...], "max_de": 1}
+
+The reference index and Lab cache of generate.py are built once at startup. A POST batch
+(at most MAX_BATCH items) runs in a worker thread, so it does not stall other clients.
+"""
+
+import asyncio, math, sys, json as _json
+from urllib.parse import urlsplit, parse_qs
+
+import generate as g
+
+PORT = 8765
+MAX_BODY = 16 * 1024 * 1024
+MAX_BATCH = 10_000      # items per POST; a batch is matched off the event loop, but still in one go
+LUT = None      # lut.Lut when started with --lut
+
+class BadRequest(Exception):
+    pass
+
+class TooLarge(BadRequest):
+    pass
+
+def _hex(value):
+    if not isinstance(value, str):
+        raise BadRequest(f"hex must be a string: {value!r}")
+    h = value.strip().lstrip('#')
+    if len(h) not in (6, 8) or any(c not in "0123456789abcdefABCDEF" for c in h):
+        raise BadRequest(f"bad hex: {value!r}")
+    return "#" + h.upper()
+
+def _max_de(value):
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            raise BadRequest(f"max_de must be a number: {value!r}") from None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value < math.inf:
+        raise BadRequest(f"max_de must be a non-negative number: {value!r}")
+    return float(value)
+
+# ============================================================
+# HANDLERS: one item -> JSON-able result
+# ============================================================
+
+def match_one(hex_color):
+    h = _hex(hex_color)
+    best, ref, delta = LUT.lookup(h) if LUT else g.find_best(h)
+    out = {"hex": h, "kind": best[0], "name": best[1], "ref": ref, "delta": round(delta, 2)}
+    final = g.SCALE_FAMILIES[best[1]]["final_solid"] if best[0] == "scale" else None
+    if final:
+        step, step_de = g.find_step(h, final)
+        out["step"] = step; out["step_de"] = round(step_de, 2)
+    return out
+
+def scale_one(base, engine="blend"):
+    h = _hex(base)
+    if engine == "blend":
+        scale = g.generate_scale(h)
+    elif engine == "oklch":
+        from oklch_scale import generate_scale_oklch
+        scale = generate_scale_oklch(h)
+    else:
+        raise BadRequest(f"unknown engine: {engine!r}")
+    return {"base": h, "scale": {str(s): v for s, v in scale.items()}}
+
+def de_one(pair):
+    if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+        raise BadRequest(f"pair must be [hex, hex]: {pair!r}")
+    return round(g.delta_e_2000(g.hex_lab(_hex(pair[0])), g.hex_lab(_hex(pair[1]))), 4)
+
+def source_one(hex_color, max_de=0.0):
+    h = _hex(hex_color)
+    sources = [dict(src, hex=f"#{c:06X}", de=round(d, 2)) for d, c, src in g.get_sources(h, _max_de(max_de))]
+    return {"hex": h, "source": g.get_source(h), "sources": sources}
+
+def route(method, path, query, body):
+    """-> JSON-able result; GET takes one item from the query string, POST a batch from the body."""
+    def q(name):
+        if name not in query:
+            raise BadRequest(f"missing query parameter: {name}")
+        return query[name][0]
+
+    def batch(key):
+        items = body.get(key) if isinstance(body, dict) else None
+        if not isinstance(items, list):
+            raise BadRequest(f"body must be {{\"{key}\": [...]}}")
+        if len(items) > MAX_BATCH:
+            raise TooLarge(f"{len(items)} {key} in one request, at most {MAX_BATCH}")
+        return items
+
+    if path == "/match":
+        return match_one(q("hex")) if method == "GET" else [match_one(h) for h in batch("hexes")]
+    if path == "/scale":
+        if method == "GET":
+            return scale_one(q("base"), query.get("engine", ["blend"])[0])
+        engine = body.get("engine", "blend") if isinstance(body, dict) else "blend"
+        if engine == "oklch":
+            from oklch_scale import generate_scales_oklch
+            bases = [_hex(b) for b in batch("bases")]
+            return [{"base": b, "scale": {str(s): v for s, v in sc.items()}} for b, sc in zip(bases, generate_scales_oklch(bases))]
+        return [scale_one(b, engine) for b in batch("bases")]
+    if path == "/de" and method == "POST":
+        return [de_one(p) for p in batch("pairs")]
+    if path == "/source":
+        if method == "GET":
+            return source_one(q("hex"), query.get("max_de", ["0"])[0])
+        max_de = _max_de(body.get("max_de", 0.0)) if isinstance(body, dict) else 0.0
+        return [source_one(h, max_de) for h in batch("hexes")]
+    return None
+
+# ============================================================
+# HTTP
+# ============================================================
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+def _content_length(headers):
+    value = headers.get("content-length") or "0"
+    if not (value.isascii() and value.isdigit()):
+        raise BadRequest(f"bad Content-Length: {value!r}")
+    if int(value) > MAX_BODY:
+        raise TooLarge("body too large")
+    return int(value)
+
+def _response(status, payload, keep_alive):
+    body = _json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("ascii") + body
+
+async def handle(reader, writer):
+    try:
+        while True:
+            try:
+                line = await reader.readline()     # a line over the StreamReader limit raises ValueError
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                if len(parts) != 3:
+                    raise BadRequest("bad request line")
+                method, target, version = parts
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                length = _content_length(headers)
+            except TooLarge as e:
+                writer.write(_response(413, {"error": str(e)}, False))
+                break
+            except BadRequest as e:
+                writer.write(_response(400, {"error": str(e)}, False))
+                break
+            except ValueError:
+                writer.write(_response(400, {"error": "header line too long"}, False))
+                break
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+            raw = await reader.readexactly(length) if length else b""
+            url = urlsplit(target)
+            try:
+                if method not in ("GET", "POST"):
+                    status, payload = 405, {"error": f"method {method} not allowed"}
+                else:
+                    body = _json.loads(raw) if raw else None
+                    query = parse_qs(url.query)
+                    if method == "POST":    # a batch is CPU work: keep the loop serving other clients
+                        result = await asyncio.get_running_loop().run_in_executor(None, route, method, url.path, query, body)
+                    else:
+                        result = route(method, url.path, query, body)
+                    status, payload = (200, result) if result is not None else (404, {"error": f"no route {method} {url.path}"})
+            except TooLarge as e:
+                status, payload = 413, {"error": str(e)}
+            except (BadRequest, ValueError) as e:
+                status, payload = 400, {"error": str(e)}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host="127.0.0.1", port=PORT):
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Serving on http://{host}:{port} ({len(g.REF_INDEX)} refs warm)")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    global LUT
+    argv = sys.argv[1:] if argv is None else argv
+    if "--metric" in argv:
+        i = argv.index("--metric")
+        g.set_metric(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+    if "--lut" in argv:
+        from lut import open_lut
+        LUT = open_lut(verbose=True)
+        argv = [a for a in argv if a != "--lut"]
+    port = int(argv[0]) if argv else PORT
+    try:
+        asyncio.run(serve(port=port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Memory-bounded report for legacy exports too large to hold in memory.
+
+    python3 generate.py --legacy export.csv --stream [-f ...] [-s ...] [-t ...]
+
+Every stage is a generator. Rows are read one at a time (iter_legacy_file) and
+matched, with a bounded cache per distinct hex. The header stats are counted on
+the fly. Each entry is appended to the buckets the report will read: a family
+step, a family without a solid scale, an Other token, or Unmatched. A bucket is
+buffered up to RUN_ROWS entries in total and then written to a temp file as a
+sorted run. The renderers read a bucket by lazily merging its runs (heapq.merge);
+a bucket with more than MERGE_FANIN runs is first merged in batches into longer
+runs, so a merge never holds more than MERGE_FANIN open files. generate.iter_html writes the page chunk by chunk. Peak memory is bounded by
+RUN_ROWS and the match cache, not by the input size. The output is the same as
+the in-memory path.
+
+Families with optimal_steps need all of their distinct colors before a step can
+be chosen: their entries wait in a pending file until the input ends.
+
+Input: .csv with name,hex[,note] columns (a header row is skipped), or .jsonl
+with [name, hex, note] or {"name", "hex", "note"} per line.
+"""
+
+import csv, heapq, os, shutil, tempfile, json as _json
+from collections import Counter
+from functools import lru_cache
+
+import generate as g
+
+RUN_ROWS = 50_000       # entries buffered across all buckets before they are flushed as sorted runs
+MERGE_FANIN = 256       # runs merged at once (one open file each)
+MATCH_CACHE = 1 << 16   # distinct hexes whose match is kept
+
+# ============================================================
+# INPUT
+# ============================================================
+
+def iter_legacy_file(path):
+    """Yield (name, hex, note) with canonical hex; a bad row raises PaletteError with its line."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".jsonl"):
+            rows = ((n, _json.loads(line)) for n, line in enumerate(f, 1) if line.strip())
+        else:
+            rows = enumerate(csv.reader(f), 1)
+        for n, row in rows:
+            if isinstance(row, dict):
+                row = [row.get("name"), row.get("hex"), row.get("note", "")]
+            if not isinstance(row, list) or len(row) < 2:
+                raise g.PaletteError(f"{path}:{n}: expected name, hex[, note]")
+            if n == 1 and str(row[1]).strip().lower() == "hex":
+                continue    # CSV header
+            name, hex_, note = row[0], row[1], row[2] if len(row) > 2 else ""
+            yield str(name), g.norm_hex(hex_, f"{path}:{n} {name!r}"), str(note or "")
+
+# ============================================================
+# SPILL: sorted runs per bucket on disk
+# ============================================================
+
+class SpillView:
+    """generate.MatchView over entries spilled to disk; see the module docstring."""
+
+    def __init__(self, run_rows=RUN_ROWS, fanin=MERGE_FANIN):
+        self.dir = tempfile.mkdtemp(prefix="color_stream_")
+        self.run_rows = run_rows
+        self.fanin = fanin
+        self.buffers = {}       # bucket -> [(key, entry)]
+        self.runs = {}          # bucket -> [(offset, count)] in its file
+        self.files = {}         # bucket -> file name
+        self.buffered = 0
+        self.total = 0
+        self.stats = (0, 0, 0)
+
+    def add(self, bucket, key, entry):
+        self.buffers.setdefault(bucket, []).append((key, entry))
+        self.buffered += 1
+        if self.buffered >= self.run_rows:
+            self.flush()
+
+    def flush(self):
+        for bucket, rows in self.buffers.items():
+            rows.sort(key=lambda r: r[0])
+            self._write_run(bucket, rows)
+        self.buffers = {}
+        self.buffered = 0
+
+    def _write_run(self, bucket, rows):
+        """Append sorted rows as a run of the bucket's file -> (offset, count)."""
+        name = self.files.setdefault(bucket, os.path.join(self.dir, f"{len(self.files)}.jsonl"))
+        count = 0
+        with open(name, "ab") as f:
+            offset = f.tell()
+            for r in rows:
+                f.write((_json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8"))
+                count += 1
+        self.runs.setdefault(bucket, []).append((offset, count))
+
+    def _run(self, name, offset, count):
+        with open(name, "rb") as f:
+            f.seek(offset)
+            for _ in range(count):
+                yield _json.loads(f.readline())
+
+    def _merged(self, bucket):
+        runs = self.runs.get(bucket, [])
+        while len(runs) > self.fanin:
+            # merge the first MERGE_FANIN runs into one appended at the end, until one merge is enough
+            batch, self.runs[bucket] = runs[:self.fanin], runs[self.fanin:]
+            self._write_run(bucket, heapq.merge(*(self._run(self.files[bucket], o, c) for o, c in batch), key=lambda r: r[0]))
+            runs = self.runs[bucket]
+        return (entry for _, entry in heapq.merge(*(self._run(self.files[bucket], o, c) for o, c in runs), key=lambda r: r[0]))
+
+    def step_items(self, fname, s):
+        return self._merged(("step", fname, s))
+
+    def family_items(self, fname):
+        return self._merged(("family", fname))
+
+    def other_items(self, tname):
+        return self._merged(("other", tname))
+
+    def far_items(self):
+        return self._merged(("far",))
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+# ============================================================
+# MATCH
+# ============================================================
+
+def match_stream(rows, families=None, others=None, only=None, sections=None, run_rows=RUN_ROWS):
+    """Match an iterable of (name, hex, note) -> (SpillView, placed in families, placed in Other).
+
+    only: families whose steps are needed (None = all); sections: analysis sections
+    whose buckets are kept (None = all). Stats always cover every row.
+    """
+    families = g.SCALE_FAMILIES if families is None else families
+    sections = g.SECTIONS if sections is None else sections
+    index = g.build_ref_index(families, others)
+    view = SpillView(run_rows)
+    deltas = Counter()              # rounded ΔE -> rows; the stats are binned from it at the end
+    group_rank = {}                 # first-seen order of groups, as fam_legacy / other_legacy keep it
+    placed = Counter()
+    pending = {}                    # optimal_steps family -> (file, distinct hexes)
+    unmatched = g.METRIC.thresholds["unmatched"]
+
+    @lru_cache(maxsize=MATCH_CACHE)
+    def match(h):
+        coords = g.METRIC.to_coords(*g.hex_to_rgb(h))     # not hex_coords: its cache is unbounded
+        return g.find_best(h, index, coords) + (coords,)
+
+    def spill(entry, kind, group, seq):
+        fdata = families.get(group) if kind == "scale" else None
+        if "families" in sections and fdata is not None and (only is None or group in only):
+            if fdata["final_solid"]:
+                if "assigned_step" in entry:
+                    view.add(("step", group, entry["assigned_step"]), [entry["step_de"], seq], entry)
+            else:
+                view.add(("family", group), [entry["delta"], seq], entry)
+        if "other" in sections and kind != "scale":
+            view.add(("other", group), [entry["delta"], seq], entry)
+        if "unmatched" in sections and entry["delta"] >= unmatched:
+            view.add(("far",), [-entry["delta"], kind != "scale", group_rank[(kind == "scale", group)], seq], entry)
+
+    try:
+        for seq, (lname, lhex, lnote) in enumerate(rows):
+            best, ref, delta, coords = match(lhex)
+            group_rank.setdefault((best[0] == "scale", best[1]), len(group_rank))
+            deferred = best[0] == "scale" and families[best[1]]["optimal_steps"] and (only is None or best[1] in only)
+            entry = g.make_entry(lname, lhex, lnote, best, ref, delta, families,
+                                 not deferred and (only is None or best[1] in only), coords)
+            deltas[entry["delta"]] += 1
+            placed[best[0] == "scale"] += 1
+            if deferred:
+                if best[1] not in pending:
+                    pending[best[1]] = (open(os.path.join(view.dir, f"pending_{len(pending)}.jsonl"), "w+", encoding="utf-8"), {})
+                f, hexes = pending[best[1]]
+                hexes.setdefault(lhex, None)
+                f.write(_json.dumps([seq, entry], ensure_ascii=False) + "\n")
+                continue
+            spill(entry, best[0], best[1], seq)
+
+        # optimal_steps families: solve over their distinct colors, then spill the waiting entries
+        for fname, (f, hexes) in pending.items():
+            slots = [{"hex": h} for h in hexes]
+            g.assign_family_steps(fname, families[fname], slots)
+            step_of = {e["hex"]: (e["assigned_step"], e["step_de"]) for e in slots}
+            f.seek(0)
+            for line in f:
+                seq, entry = _json.loads(line)
+                entry["assigned_step"], entry["step_de"] = step_of[entry["hex"]]
+                spill(entry, "scale", fname, seq)
+            f.close()
+        view.flush()
+    except BaseException:
+        for f, _ in pending.values():
+            f.close()
+        view.close()        # a bad row or step_capacity must not leave the spill dir behind
+        raise
+    view.total = sum(deltas.values())
+    view.stats = g.delta_stats(deltas.elements())
+    return view, placed[True], placed[False]
@@ -0,0 +1,25 @@
+import json, os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+UPDATE = os.environ.get("UPDATE_GOLDEN") == "1"
+
+def check_golden(name, actual):
+    """Compare text with tests/golden/<name>; UPDATE_GOLDEN=1 rewrites the file instead."""
+    path = os.path.join(GOLDEN_DIR, name)
+    if UPDATE or not os.path.exists(path):
+        if not UPDATE:
+            pytest.fail(f"no golden {name}; run with UPDATE_GOLDEN=1 to create it")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(actual)
+        return
+    with open(path, encoding="utf-8") as f:
+        expected = f.read()
+    assert actual == expected, f"{name} differs from golden; rerun with UPDATE_GOLDEN=1 if the change is intended"
+
+def dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, indent=1, sort_keys=True) + "\n"
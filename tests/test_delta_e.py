@@ -0,0 +1,78 @@
+"""CIEDE2000 against the Sharma, Wu & Dalal (2005) test data, plus basic properties."""
+
+import random
+
+import pytest
+
+import generate as g
+
+# (Lab 1, Lab 2, ΔE00) - Table 1 of "The CIEDE2000 color-difference formula:
+# implementation notes, supplementary test data, and mathematical observations"
+SHARMA = [
+    ((50.0000, 2.6772, -79.7751), (50.0000, 0.0000, -82.7485), 2.0425),
+    ((50.0000, 3.1571, -77.2803), (50.0000, 0.0000, -82.7485), 2.8615),
+    ((50.0000, 2.8361, -74.0200), (50.0000, 0.0000, -82.7485), 3.4412),
+    ((50.0000, -1.3802, -84.2814), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, -1.1848, -84.8006), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, -0.9009, -85.5211), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, 0.0000, 0.0000), (50.0000, -1.0000, 2.0000), 2.3669),
+    ((50.0000, -1.0000, 2.0000), (50.0000, 0.0000, 0.0000), 2.3669),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0009), 7.1792),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0010), 7.1792),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0011), 7.2195),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0012), 7.2195),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0009, -2.4900), 4.8045),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0010, -2.4900), 4.8045),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0011, -2.4900), 4.7461),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 0.0000, -2.5000), 4.3065),
+    ((50.0000, 2.5000, 0.0000), (73.0000, 25.0000, -18.0000), 27.1492),
+    ((50.0000, 2.5000, 0.0000), (61.0000, -5.0000, 29.0000), 22.8977),
+    ((50.0000, 2.5000, 0.0000), (56.0000, -27.0000, -3.0000), 31.9030),
+    ((50.0000, 2.5000, 0.0000), (58.0000, 24.0000, 15.0000), 19.4535),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.1736, 0.5854), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.2972, 0.0000), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 1.8634, 0.5757), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.2592, 0.3350), 1.0000),
+    ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ((63.0109, -31.0961, -5.8663), (62.8187, -29.7946, -4.0864), 1.2630),
+    ((61.2901, 3.7196, -5.3901), (61.4292, 2.2480, -4.9620), 1.8731),
+    ((35.0831, -44.1164, 3.7933), (35.0232, -40.0716, 1.5901), 1.8645),
+    ((22.7233, 20.0904, -46.6940), (23.0331, 14.9730, -42.5619), 2.0373),
+    ((36.4612, 47.8580, 18.3852), (36.2715, 50.5065, 21.2231), 1.4146),
+    ((90.8027, -2.0831, 1.4410), (91.1528, -1.6435, 0.0447), 1.4441),
+    ((90.9257, -0.5406, -0.9208), (88.6381, -0.8985, -0.7239), 1.5381),
+    ((6.7747, -0.2908, -2.4247), (5.8714, -0.0985, -2.2286), 0.6377),
+    ((2.0776, 0.0795, -1.1350), (0.9033, -0.0636, -0.5514), 0.9082),
+]
+
+def random_labs(n, seed):
+    rnd = random.Random(seed)
+    return [g.rgb_to_lab(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(n)]
+
+@pytest.mark.parametrize("lab1,lab2,expected", SHARMA)
+def test_sharma_reference(lab1, lab2, expected):
+    assert g.delta_e_2000(lab1, lab2) == pytest.approx(expected, abs=5e-5)
+    assert g.delta_e_2000(lab2, lab1) == pytest.approx(expected, abs=5e-5)
+
+def test_zero_on_identical():
+    for lab in random_labs(500, 1):
+        assert g.delta_e_2000(lab, lab) == 0.0
+    assert g.de("#0D99F6", "#0d99f6") == 0.0
+
+def test_symmetric_nonnegative():
+    labs = random_labs(1000, 2)
+    for a, b in zip(labs, labs[1:]):
+        d = g.delta_e_2000(a, b)
+        assert d >= 0
+        assert d == pytest.approx(g.delta_e_2000(b, a), abs=1e-9)
+
+def test_black_white():
+    assert g.de("#000000", "#FFFFFF") == pytest.approx(100.0, abs=1e-3)
+
+def test_rgb_roundtrip():
+    rnd = random.Random(3)
+    for _ in range(500):
+        rgb = tuple(rnd.randrange(256) for _ in range(3))
+        assert g.hex_to_rgb(g.rgb_to_hex(*rgb)) == rgb
+        lin = [g.srgb_to_linear(c) for c in rgb]
+        assert tuple(g.linear_to_srgb(c) for c in lin) == rgb
@@ -0,0 +1,337 @@
+"""Randomized differential tests: every fast path against the scalar reference."""
+
+import copy, itertools, marshal, os, random, subprocess, sys, zlib
+
+import pytest
+
+import generate as g
+
+def random_rgbs(n, seed):
+    rnd = random.Random(seed)
+    return [(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(n)]
+
+def random_hexes(n, seed):
+    return [g.rgb_to_hex(*rgb) for rgb in random_rgbs(n, seed)]
+
+# ============================================================
+# NumPy batch color math
+# ============================================================
+
+def test_rgb_to_lab_batch():
+    np = pytest.importorskip("numpy")
+    rgbs = random_rgbs(5000, 10) + [(0, 0, 0), (255, 255, 255), (10, 10, 10), (11, 11, 11)]
+    batch = g.rgb_to_lab_batch(np.array(rgbs))
+    for rgb, lab in zip(rgbs, batch):
+        assert lab == pytest.approx(g.rgb_to_lab(*rgb), abs=1e-9)
+
+def test_delta_e_2000_batch():
+    np = pytest.importorskip("numpy")
+    labs1 = [g.rgb_to_lab(*c) for c in random_rgbs(3000, 11)]
+    labs2 = [g.rgb_to_lab(*c) for c in random_rgbs(3000, 12)]
+    # hue-wrap and achromatic corners of the formula
+    labs1 += [(50, 2.49, -0.001), (50, 0, 0), (50, -0.001, 2.49)]
+    labs2 += [(50, -2.49, 0.0011), (50, 0, 0), (50, 0.0011, -2.49)]
+    pairwise = g.delta_e_2000_batch(np.array(labs1), np.array(labs2))
+    one_ref = g.delta_e_2000_batch(np.array(labs1), np.array(labs2[0]))
+    for a, b, d, d0 in zip(labs1, labs2, pairwise, one_ref):
+        assert d == pytest.approx(g.delta_e_2000(a, b), abs=1e-9)
+        assert d0 == pytest.approx(g.delta_e_2000(a, labs2[0]), abs=1e-9)
+
+@pytest.mark.parametrize("name", list(g.METRICS))
+def test_metric_batch_matches_scalar(name):
+    np = pytest.importorskip("numpy")
+    m = g.METRICS[name]
+    rgb1, rgb2 = random_rgbs(2000, 30), random_rgbs(2000, 31)
+    c1, c2 = m.to_coords_batch(np.array(rgb1)), m.to_coords_batch(np.array(rgb2))
+    d = m.batch(c1, c2)
+    for x, y, cx, cy, dx in zip(rgb1, rgb2, c1, c2, d):
+        sx, sy = m.to_coords(*x), m.to_coords(*y)
+        assert cx == pytest.approx(sx, abs=1e-9) and cy == pytest.approx(sy, abs=1e-9)
+        assert dx == pytest.approx(m.scalar(sx, sy), rel=1e-9, abs=1e-9)
+        assert m.scalar(sx, sx) == 0.0
+
+def test_set_metric_drives_matching():
+    try:
+        g.set_metric("de76")
+        assert [r[3] for r in g.REF_INDEX] == [g.rgb_to_lab(*g.hex_to_rgb(r[2])) for r in g.REF_INDEX]
+        for h in random_hexes(200, 32):
+            lab = g.rgb_to_lab(*g.hex_to_rgb(h))
+            best = min(g.REF_INDEX, key=lambda r: g.euclid(lab, r[3]))
+            assert g.find_best(h)[1:] == (best[2], pytest.approx(g.euclid(lab, best[3])))
+    finally:
+        g.set_metric("de2000")
+
+# ============================================================
+# OKLCH scales: vectorized batch vs per-color
+# ============================================================
+
+def test_oklch_batch_matches_scalar():
+    pytest.importorskip("numpy")
+    from oklch_scale import generate_scale_oklch, generate_scales_oklch
+    bases = random_hexes(400, 13) + [fd["base_100"] for fd in g.SCALE_FAMILIES.values()]
+    for base, scale in zip(bases, generate_scales_oklch(bases)):
+        expected = generate_scale_oklch(base)
+        for s in g.STEPS:
+            got, want = g.hex_to_rgb(scale[s]), g.hex_to_rgb(expected[s])
+            assert max(abs(a - b) for a, b in zip(got, want)) <= 1, (base, s, scale[s], expected[s])
+
+# ============================================================
+# Optimal step assignment vs brute force
+# ============================================================
+
+def test_solve_is_optimal():
+    from optimal_assign import solve
+    rnd = random.Random(14)
+    for _ in range(200):
+        k = rnd.randint(1, 4)
+        caps = [rnd.randint(0, 3) for _ in range(k)]
+        n = rnd.randint(0, min(6, sum(caps)))
+        costs = [[round(rnd.uniform(0, 20), 1) for _ in range(k)] for _ in range(n)]
+        at = solve(costs, caps)
+        assert all(at.count(j) <= caps[j] for j in range(k))
+        best = min((sum(costs[i][j] for i, j in enumerate(p)) for p in itertools.product(range(k), repeat=n)
+                    if all(p.count(j) <= caps[j] for j in range(k))), default=0)
+        assert sum(costs[i][j] for i, j in enumerate(at)) == pytest.approx(best, abs=1e-9)
+
+def test_solve_rejects_short_capacity():
+    from optimal_assign import solve
+    with pytest.raises(ValueError):
+        solve([[1.0], [2.0]], [1])
+
+# ============================================================
+# Incremental palette diff vs full rematch
+# ============================================================
+
+def test_diff_versions_matches_full_rematch():
+    import palette_diff
+    old = (g.SCALE_FAMILIES, g.OTHER_TOKENS)
+    families = copy.deepcopy(g.SCALE_FAMILIES)
+    families["celestial_blue"]["refs"].append("#2F9BFF")
+    families["yellow"]["refs"] = families["yellow"]["refs"][1:]
+    families["green"]["base_100"] = "#12C050"
+    families = g.build_final_solid(families)
+    new = (families, g.OTHER_TOKENS)
+    report = palette_diff.diff_versions(old, new)
+    old_index, new_index = g.build_ref_index(*old), g.build_ref_index(*new)
+    changed = {r["name"]: r for r in report["rows"]}
+    for lname, lhex, lnote in g.LEGACY:
+        best, ref, delta = g.find_best(lhex, new_index)
+        entry = g.make_entry(lname, lhex, lnote, best, ref, delta, families)
+        if lname in changed:
+            side = changed[lname]["new"]
+            assert (side["group"], side["ref"], side["delta"], side["step"]) == \
+                   (f"{best[0]}:{best[1]}", entry["ref"], entry["delta"], entry.get("assigned_step"))
+        else:
+            ob, oref, odelta = g.find_best(lhex, old_index)
+            old_entry = g.make_entry(lname, lhex, lnote, ob, oref, odelta, g.SCALE_FAMILIES)
+            assert (ob, old_entry["delta"], old_entry.get("assigned_step")) == (best, entry["delta"], entry.get("assigned_step")), lname
+    assert report["summary"]["rematched"] < len(g.LEGACY)
+
+# ============================================================
+# Screenshot reader: NumPy unfilter vs pure Python
+# ============================================================
+
+def _png(path, width, height, rows, filters):
+    import struct
+    def chunk(ctype, data):
+        return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(ctype + data))
+    raw = b"".join(bytes([ft]) + row for ft, row in zip(filters, rows))
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+def test_unfilter_fast_path(monkeypatch):
+    np = pytest.importorskip("numpy")
+    import audit
+    rnd = random.Random(15)
+    for ft in (1, 2):
+        for _ in range(50):
+            line = bytearray(rnd.randrange(256) for _ in range(3 * 37))
+            prev = bytearray(rnd.randrange(256) for _ in range(3 * 37))
+            fast, slow = bytearray(line), bytearray(line)
+            monkeypatch.setattr(audit, "_np", np)
+            audit._unfilter(ft, fast, prev, 3)
+            monkeypatch.setattr(audit, "_np", None)
+            audit._unfilter(ft, slow, prev, 3)
+            assert fast == slow
+
+def test_unfilter_rows_matches_bytewise(monkeypatch):
+    np = pytest.importorskip("numpy")
+    import audit
+    monkeypatch.setattr(audit, "_np", np)
+    rnd = random.Random(19)
+    for bpp, width, rows in ((3, 37, 40), (4, 11, 7), (1, 5, 1)):
+        prev = bytearray(rnd.randrange(256) for _ in range(bpp * width))
+        block = [(rnd.randrange(5), bytearray(rnd.randrange(256) for _ in range(bpp * width))) for _ in range(rows)]
+        fast = audit._unfilter_rows([(ft, bytearray(line)) for ft, line in block], prev, bpp)
+        slow, above = [], prev
+        for ft, line in block:
+            line = bytearray(line)
+            audit._unfilter(ft, line, above, bpp)
+            slow.append(line); above = line
+        assert fast == slow
+    with pytest.raises(ValueError):
+        audit._unfilter_rows([(5, bytearray(3)), (3, bytearray(3))], bytearray(3), 3)
+
+def test_png_decodes_all_filters(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    import audit
+    rnd = random.Random(20)
+    width, height = 23, 70
+    rows = [bytes(rnd.randrange(256) for _ in range(3 * width)) for _ in range(height)]
+    path = str(tmp_path / "filters.png")
+    _png(path, width, height, rows, [rnd.randrange(5) for _ in range(height)])   # rows read as filtered data
+    monkeypatch.setattr(audit, "PNG_BLOCK_ROWS", 16)
+    monkeypatch.setattr(audit, "_np", np)
+    fast = list(audit.png_rows(path))
+    monkeypatch.setattr(audit, "_np", None)
+    assert fast == list(audit.png_rows(path))
+
+def test_broken_png_is_skipped(tmp_path):
+    import audit
+    good = str(tmp_path / "good.png")
+    _png(good, 4, 3, [bytes(12)] * 3, [0] * 3)
+    data = open(good, "rb").read()
+    broken = {"sig_only": data[:8], "short_ihdr": data[:8] + b"\0\0\0\x02IHDR\0\0\0\0\0\0",
+              "cut_idat": data[:-20], "no_idat": data[:33] + data[-12:]}
+    for name, blob in broken.items():
+        (tmp_path / f"{name}.png").write_bytes(blob)
+        with pytest.raises(ValueError):
+            list(audit.png_rows(str(tmp_path / f"{name}.png")))
+    report = audit.audit([str(tmp_path)], workers=1)
+    assert report["summary"]["files"] == 1 and sorted(report["errors"]) == sorted(str(tmp_path / f"{n}.png") for n in broken)
+
+def test_audit_far_follows_metric():
+    import audit
+    report = {"summary": {"files": 0, "pixels": 1, "colors": 1, "min_de": 1.0, "off_palette_colors": 1, "off_palette_coverage": 1.0},
+              "off_palette": [{"hex": "#123456", "pixels": 1, "coverage": 1.0, "group": "other:x", "ref": "#000000", "delta": 12.0, "files": 1}],
+              "files": [], "errors": {}}
+    assert "далёкий" in audit.render_audit_html(report)            # ΔE2000: far from 10
+    try:
+        g.set_metric("de76")                                        # ΔE76: far from 19
+        assert "далёкий" not in audit.render_audit_html(report)
+    finally:
+        g.set_metric("de2000")
+
+def test_histogram_engines_agree(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    import audit
+    rnd = random.Random(16)
+    palette = [bytes(c) for c in random_rgbs(8, 17)]
+    width, height = 19, 150
+    rows = [b"".join(rnd.choice(palette) for _ in range(width)) for _ in range(height)]
+    path = str(tmp_path / "shot.png")
+    _png(path, width, height, rows, [0] * height)   # filter 0 keeps the encoder trivial
+    expected = {}
+    for row in rows:
+        for i in range(0, len(row), 3):
+            c = int.from_bytes(row[i:i + 3], "big")
+            expected[c] = expected.get(c, 0) + 1
+    monkeypatch.setattr(audit, "_np", np)
+    assert audit.histogram(path) == (path, width * height, expected)
+    monkeypatch.setattr(audit, "_np", None)
+    assert audit.histogram(path) == (path, width * height, expected)
+
+# ============================================================
+# Nearest-token table vs find_best
+# ============================================================
+
+@pytest.fixture(scope="module")
+def built_lut(tmp_path_factory):
+    pytest.importorskip("numpy")
+    import lut as lut_mod
+    path = tmp_path_factory.mktemp("lut")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(lut_mod, "CACHE_DIR", str(path))
+        table = lut_mod.open_lut()     # built into a temp dir (~35 s), shared by the tests below
+    yield table, path
+    table.close()
+
+def _check_lut(table, hexes):
+    for h in hexes:
+        best, ref, d = g.find_best(h)
+        got_best, got_ref, got_d = table.lookup(h)
+        assert (got_best, got_ref) == (best, ref), h
+        assert got_d == pytest.approx(d, abs=0.006)
+
+def test_lut_matches_find_best(built_lut):
+    table, path = built_lut
+    assert {p.stat().st_mode & 0o777 for p in path.iterdir()} == {0o600}
+    _check_lut(table, random_hexes(3000, 18) + [r[2] for r in g.REF_INDEX])
+
+def test_lut_exact_in_dense_blocks(built_lut):
+    # every color of blocks where a neighbouring ref reaches into a cell without touching
+    # its corners (#2876FF is deep_purple, #2A3E48 dark_indigo)
+    blocks = [(range(0x20, 0x30), range(0x70, 0x80), range(0xF0, 0x100)),
+              (range(0x28, 0x30), range(0x38, 0x48), range(0x40, 0x50))]
+    _check_lut(built_lut[0], [g.rgb_to_hex(r, g_, b) for rs, gs, bs in blocks
+                              for r, g_, b in itertools.product(rs, gs, bs)])
+
+def test_lut_refuses_untrusted_file(tmp_path, monkeypatch):
+    import lut as lut_mod
+    path = tmp_path / "lut.bin"
+    with open(path, "wb") as f:
+        f.truncate(3 * lut_mod.N)
+    path.chmod(0o664)
+    with pytest.raises(ValueError, match="writable by others"):
+        lut_mod.Lut(str(path), g.REF_INDEX)
+    path.chmod(0o600)
+    lut_mod.Lut(str(path), g.REF_INDEX).close()
+    # the table key follows the ΔE code, not just the refs and the metric name
+    key = lut_mod.refs_hash()
+    monkeypatch.setattr(g, "source_hash", lambda: "00000000")
+    assert lut_mod.refs_hash() != key
+
+# ============================================================
+# Precompiled references vs a fresh build
+# ============================================================
+
+def test_refs_cache_matches_build(tmp_path, monkeypatch):
+    monkeypatch.setattr(g, "REFS_CACHE_DIR", str(tmp_path))
+    raw = (g.SCALE_FAMILIES, g.OTHER_TOKENS, g.LEGACY, g.WEB_CSS_VARS)
+    fresh = g.build_refs(*raw)
+    assert g.load_refs(raw) == fresh      # miss: built and saved
+    loaded = g.load_refs(raw)             # hit
+    assert loaded == fresh and [type(x) for x in loaded] == [type(x) for x in fresh]
+    assert loaded == (g.SCALE_FAMILIES, g.OTHER_TOKENS, g.LEGACY, g.WEB_CSS_VARS,
+                      g.PROVENANCE, g.REF_INDEX, g.FAMILY_JSONS)
+    # a changed definition is another file; a corrupt file is rebuilt
+    others = copy.copy(g.OTHER_TOKENS)
+    others["probe"] = "#123456"
+    assert g.load_refs(raw[:1] + (others,) + raw[2:])[1]["probe"] == "#123456"
+    assert len(list(tmp_path.iterdir())) == 2
+    for p in tmp_path.iterdir():
+        p.write_bytes(b"junk")
+    assert g.load_refs(raw) == fresh
+
+def test_refs_cache_ignores_untrusted_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(g, "REFS_CACHE_DIR", str(tmp_path))
+    raw = (g.SCALE_FAMILIES, g.OTHER_TOKENS, g.LEGACY, g.WEB_CSS_VARS)
+    fresh = g.load_refs(raw)
+    (path,) = tmp_path.iterdir()
+    assert path.stat().st_mode & 0o777 == 0o600
+    # a group-writable file could hold anyone's references: it is rebuilt, not loaded
+    key, refs = marshal.loads(path.read_bytes())
+    planted = marshal.dumps((key, (refs[0], {"planted": "#000000"}) + refs[2:]))
+    path.write_bytes(planted)
+    assert g.load_refs(raw)[1] == {"planted": "#000000"}
+    path.write_bytes(planted)
+    path.chmod(0o664)
+    assert g.load_refs(raw) == fresh
+
+def test_refs_key_covers_source(monkeypatch):
+    raw = (g.SCALE_FAMILIES, g.OTHER_TOKENS, g.LEGACY, g.WEB_CSS_VARS)
+    key = g.refs_key(raw)
+    monkeypatch.setattr(g, "source_hash", lambda: "00000000")
+    assert g.refs_key(raw) != key
+
+def test_duplicate_key_fails_import(tmp_path):
+    src = open(g.__file__, encoding="utf-8").read()
+    src = src.replace('"base_100": "#0D99F6",', '"base_100": "#0D99F6", "base_100": "#0D99F7",', 1)
+    (tmp_path / "generate.py").write_text(src, encoding="utf-8")
+    env = dict(os.environ, COLOR_REVIEW_CACHE=str(tmp_path / "cache"))
+    run = lambda *args: subprocess.run([sys.executable, *args], cwd=tmp_path, env=env, capture_output=True, text=True)
+    imported = run("-c", "import generate")
+    assert imported.returncode and "PaletteError" in imported.stderr and "duplicate key 'base_100'" in imported.stderr
+    cli = run("generate.py")
+    assert cli.returncode == 1 and cli.stderr.startswith("error: 1 palette error(s)") and "Traceback" not in cli.stderr
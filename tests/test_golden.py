@@ -0,0 +1,71 @@
+"""Snapshots of the built-in LEGACY run: match assignments and the rendered report."""
+
+import copy, sys
+
+import generate as g
+from conftest import check_golden, dumps
+
+def test_total_colors_preserved():
+    fam_legacy, other_legacy = g.match_legacy()
+    placed = sum(len(v) for v in fam_legacy.values()) + sum(len(v) for v in other_legacy.values())
+    assert placed == g.TOTAL_INPUT == len(g.LEGACY)
+
+def test_legacy_matches():
+    fam_legacy, other_legacy = g.match_legacy()
+    check_golden("legacy_matches.json", dumps({"families": fam_legacy, "other": other_legacy}))
+
+def test_report_html():
+    fam_legacy, other_legacy = g.match_legacy()
+    check_golden("report.html", g.render_html(fam_legacy, other_legacy))
+
+def test_web_comparison():
+    check_golden("web_compare.json", dumps(g.build_web_comparison()))
+
+def test_filtered_report_keeps_global_stats():
+    full = g.render_html(*g.match_legacy())
+    fam_legacy, other_legacy = g.match_legacy(only={"yellow"})
+    assert all("assigned_step" not in e for f, items in fam_legacy.items() if f != "yellow" for e in items)
+    part = g.render_html(fam_legacy, other_legacy, families=["yellow"], sections=("families",), tabs=("analysis",))
+    stats = lambda html: html[html.index('<div class="stats"'):html.index('<div class="de-info">')]
+    assert stats(part) == stats(full)
+    assert "exportJSON('yellow')" in part and "exportJSON('green')" not in part
+    assert 'id="tab-compare"' not in part and "Other — одиночные" not in part
+
+def test_legend_follows_metric():
+    try:
+        g.set_metric("itp")
+        T = g.METRIC.thresholds
+        html = g.render_html(*g.match_legacy(), tabs=("analysis",))
+        legend = html[html.index('<div class="de-info">'):]
+        legend = legend[:legend.index('</div>\n</div>')]
+        assert "ΔEITP" in legend and "2000" not in legend
+        assert f'ΔE &lt; {T["merged"]:g} ' in legend and f'ΔE ≥ {T["far"]:g} ' in legend
+        assert f'ΔE≥{T["far"]:g}' in html      # header stats use the same bounds
+    finally:
+        g.set_metric("de2000")
+
+def test_web_comparison_keeps_to_own_steps():
+    families = copy.deepcopy(g.SCALE_FAMILIES)
+    families["green"]["also_alpha"] = [("Green overlay", "#10C84E", {20: 0.2})]
+    cmp = g.build_web_comparison(families)
+    # a step Cross lacks is unaligned, not filled with the neighbouring Cross step
+    assert [(r["step"], r["status"]) for r in cmp["green"]["steps"] if r["web"] is None] == [(10, "unaligned")]
+    # without Cross steps, only the family's own web colors stand in: not another family's
+    # Cross step, and the family's ref is the nearest to it by ΔE2000
+    for fname in ("lime_green", "deep_purple", "chili_red"):
+        for r in cmp[fname]["steps"]:
+            if r["web"]:
+                assert not any(src["kind"] == "cross" for src in g.PROVENANCE[g.pack_hex(r["web"])]), (fname, r)
+                nearest = min(g.REF_INDEX, key=lambda ref: g.delta_e_2000(g.hex_lab(r["web"]), g.hex_lab(ref[2])))
+                assert nearest[:2] == ("scale", fname), (fname, r)
+    assert cmp["green"]["not_compared"] == ["Green overlay #10C84E"] and cmp["yellow"]["not_compared"] == []
+
+def test_web_comparison_is_de2000(monkeypatch):
+    expected = dumps(g.build_web_comparison())
+    try:
+        g.set_metric("itp")
+        assert dumps(g.build_web_comparison()) == expected      # owners and ΔE do not follow --metric
+    finally:
+        g.set_metric("de2000")
+    monkeypatch.setitem(sys.modules, "numpy", None)             # scalar fallback, same numbers
+    assert dumps(g.build_web_comparison()) == expected
@@ -0,0 +1,50 @@
+"""The report's in-browser matcher (JS pgMatch) against find_best / find_step, run in node."""
+
+import json, shutil, subprocess
+
+import pytest
+
+import generate as g
+from test_engines import random_hexes
+
+NODE = shutil.which("node")
+
+def run_js(tmp_path, expr, **values):
+    """Evaluate expr in node with generate.JS loaded and values bound as constants -> parsed JSON."""
+    consts = "".join(f"const {k}={json.dumps(v)};\n" for k, v in values.items())
+    path = tmp_path / "run.js"
+    path.write_text(g.JS + consts + f"process.stdout.write(JSON.stringify({expr}));\n", encoding="utf-8")
+    return json.loads(subprocess.run([NODE, str(path)], capture_output=True, check=True, text=True).stdout)
+
+@pytest.mark.skipif(NODE is None, reason="node not installed")
+def test_js_matches_python(tmp_path):
+    steps = [f["final_solid"][s]["hex"] for f in g.SCALE_FAMILIES.values() if f.get("final_solid") for s in g.STEPS]
+    hexes = random_hexes(3000, 41) + [r[2] for r in g.REF_INDEX] + steps + ["#000000", "#FFFFFF", "#808080"]
+    got = run_js(tmp_path, "hexes.map(h=>[pgLab(h),pgMatch(h,data)])", hexes=hexes, data=g.playground_data())
+    for h, (lab, m) in zip(hexes, got):
+        assert lab == pytest.approx(g.hex_lab(h), abs=1e-9), h
+        best, ref, d = g.find_best(h)
+        assert (m["kind"], m["name"], m["ref"]) == (*best, ref), h
+        assert m["de"] == pytest.approx(d, abs=1e-9), h
+        final = g.SCALE_FAMILIES[best[1]].get("final_solid") if best[0] == "scale" else None
+        if final:
+            step, step_de = g.find_step(h, final)
+            assert (m["step"], m["step_de"]) == (step, pytest.approx(step_de, abs=1e-9)), h
+        else:
+            assert "step" not in m, h
+
+@pytest.mark.skipif(NODE is None, reason="node not installed")
+def test_js_parses_pasted_list(tmp_path):
+    text = "#0d99f6\nbutton_bg #FF6170\ndecade: 80FF6170\n\nno color here\n  2F2F45 , text  "
+    assert run_js(tmp_path, "pgParse(text)", text=text) == [
+        {"hex": "#0D99F6", "label": ""},
+        {"hex": "#FF6170", "label": "button_bg"},
+        {"hex": "#FF6170", "label": "decade"},
+        {"hex": "#2F2F45", "label": "text"},
+    ]
+
+def test_report_embeds_playground():
+    html = g.render_html(*g.match_legacy(), tabs=("playground",))
+    data = html[html.index('id="pg-data">') + len('id="pg-data">'):]
+    assert json.loads(data[:data.index("</script>")]) == json.loads(json.dumps(g.playground_data()))
+    assert 'id="tab-analysis"' not in html and "function pgMatch" in html
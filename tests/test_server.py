@@ -0,0 +1,73 @@
+"""HTTP framing of server.handle: malformed requests get a status, not a dropped connection."""
+
+import asyncio, json, threading
+
+import pytest
+
+import server
+
+class _Writer:
+    def __init__(self):
+        self.data = b""
+    def write(self, data):
+        self.data += data
+    async def drain(self):
+        pass
+    def close(self):
+        pass
+
+async def _exchange(raw):
+    reader = asyncio.StreamReader()
+    reader.feed_data(raw)
+    reader.feed_eof()
+    writer = _Writer()
+    await server.handle(reader, writer)
+    return writer.data
+
+def exchange(raw):
+    """Feed raw bytes to server.handle -> (status, JSON body) of the first response."""
+    head, _, rest = asyncio.run(_exchange(raw)).partition(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+    return int(head.split()[1]), json.loads(rest[:length])
+
+@pytest.mark.parametrize("length", [b"abc", b"-5", b"1e3", b"\xd9\xa3"])
+def test_bad_content_length(length):
+    status, body = exchange(b"POST /de HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+    assert status == 400 and "Content-Length" in body["error"]
+
+def test_body_too_large():
+    status, _ = exchange(b"POST /de HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (server.MAX_BODY + 1))
+    assert status == 413
+
+def test_overlong_header_line():
+    status, _ = exchange(b"GET /match HTTP/1.1\r\nX-Long: " + b"a" * (1 << 17) + b"\r\n\r\n")
+    assert status == 400
+
+def test_valid_request_still_served():
+    status, body = exchange(b"GET /match?hex=%230D99F6 HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert status == 200 and body["hex"] == "#0D99F6"
+
+@pytest.mark.parametrize("max_de", ["null", "[1]", "-1", "true", '"abc"'])
+def test_bad_max_de(max_de):
+    body = b'{"hexes": ["#FF6170"], "max_de": ' + max_de.encode() + b"}"
+    status, payload = exchange(b"POST /source HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+    assert status == 400 and "max_de" in payload["error"]
+
+def test_bad_max_de_query():
+    status, payload = exchange(b"GET /source?hex=%23FF6170&max_de=nan HTTP/1.1\r\n\r\n")
+    assert status == 400 and "max_de" in payload["error"]
+
+def test_batch_limit(monkeypatch):
+    monkeypatch.setattr(server, "MAX_BATCH", 2)
+    body = b'{"hexes": ["#FF6170", "#0D99F6", "#10C84E"]}'
+    status, payload = exchange(b"POST /match HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+    assert status == 413 and "at most 2" in payload["error"]
+
+def test_batch_runs_off_the_loop(monkeypatch):
+    threads = []
+    route = server.route
+    monkeypatch.setattr(server, "route", lambda *a: threads.append(threading.get_ident()) or route(*a))
+    body = b'{"hexes": ["#FF6170"], "max_de": 1}'
+    status, payload = exchange(b"POST /source HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+    assert status == 200 and payload[0]["hex"] == "#FF6170"
+    assert threads and threads[0] != threading.get_ident()
@@ -0,0 +1,73 @@
+"""Streaming mode renders the same report as the in-memory path."""
+
+import os, random
+
+import pytest
+
+import generate as g
+import stream
+
+def _both(legacy, **kw):
+    fam_legacy, other_legacy = g.match_legacy(legacy, only=kw.get("only"))
+    expected = "".join(g.iter_html(g.MatchView(fam_legacy, other_legacy, len(legacy)), **{k: v for k, v in kw.items() if k != "only"}))
+    view, in_fam, in_other = stream.match_stream(iter(legacy), only=kw.get("only"), sections=kw.get("sections"), run_rows=7)
+    try:
+        got = "".join(g.iter_html(view, **{k: v for k, v in kw.items() if k != "only"}))
+    finally:
+        view.close()
+    assert in_fam + in_other == len(legacy)
+    return expected, got
+
+def test_stream_matches_in_memory():
+    expected, got = _both(g.LEGACY)
+    assert got == expected
+
+def test_stream_optimal_steps_and_filters(monkeypatch):
+    monkeypatch.setitem(g.SCALE_FAMILIES["celestial_blue"], "optimal_steps", True)
+    rnd = random.Random(20)
+    legacy = g.LEGACY + [(f"c{i}", g.rgb_to_hex(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)), "")
+                         for i in range(300)]
+    expected, got = _both(legacy)
+    assert got == expected
+    expected, got = _both(legacy, only={"celestial_blue"}, families=["celestial_blue"], sections=("families", "unmatched"))
+    assert got == expected
+
+def test_step_capacity_too_small(monkeypatch):
+    monkeypatch.setitem(g.SCALE_FAMILIES["celestial_blue"], "optimal_steps", True)
+    monkeypatch.setitem(g.SCALE_FAMILIES["celestial_blue"], "step_capacity", {100: 1})
+    with pytest.raises(g.PaletteError, match="celestial_blue.*room for 1 colors"):
+        g.match_legacy()
+    dirs = []
+    monkeypatch.setattr(stream.tempfile, "mkdtemp", lambda mk=stream.tempfile.mkdtemp, **kw: dirs.append(mk(**kw)) or dirs[-1])
+    with pytest.raises(g.PaletteError, match="celestial_blue.*room for 1 colors"):
+        stream.match_stream(iter(g.LEGACY))
+    assert dirs and not any(os.path.exists(d) for d in dirs)      # spill dir removed
+
+def test_iter_legacy_file(tmp_path):
+    csv_path = tmp_path / "export.csv"
+    csv_path.write_text("name,hex,note\nbtn,#0d99f6,primary\nbg,FFFFFF\n", encoding="utf-8")
+    assert list(stream.iter_legacy_file(str(csv_path))) == [("btn", "#0D99F6", "primary"), ("bg", "#FFFFFF", "")]
+    jsonl = tmp_path / "export.jsonl"
+    jsonl.write_text('["a", "#000000", "x"]\n{"name": "b", "hex": "#123456"}\n', encoding="utf-8")
+    assert list(stream.iter_legacy_file(str(jsonl))) == [("a", "#000000", "x"), ("b", "#123456", "")]
+    bad = tmp_path / "bad.csv"
+    bad.write_text("a,#12345\n", encoding="utf-8")
+    with pytest.raises(g.PaletteError, match="bad.csv:1"):
+        list(stream.iter_legacy_file(str(bad)))
+
+def test_merge_fanin(monkeypatch):
+    view = stream.SpillView(run_rows=1, fanin=3)
+    try:
+        keys = random.Random(38).sample(range(1000), 50)
+        for k in keys:
+            view.add(("far",), [k], {"k": k})
+        assert len(view.runs[("far",)]) == 50
+        assert [e["k"] for e in view.far_items()] == sorted(keys)
+        assert len(view.runs[("far",)]) <= 3       # merged in batches, kept for the next read
+        assert [e["k"] for e in view.far_items()] == sorted(keys)
+    finally:
+        view.close()
+    spill_view = stream.SpillView
+    monkeypatch.setattr(stream, "SpillView", lambda run_rows: spill_view(run_rows, fanin=2))
+    expected, got = _both(g.LEGACY)
+    assert got == expected